@@ -0,0 +1,54 @@
+# Columnar (parquet) cache of the raw daily AIS csv files
+import os
+import json
+import pandas as pd
+
+from AISSchema import AISSchema
+from FileSignature import FileSignature
+
+
+class AISCache():
+    CACHE_FOLDER = r'./data/cache/ais'
+
+    def __init__(self, cacheFolder = CACHE_FOLDER, checkHash = True):
+        self.cacheFolder = cacheFolder
+        self.checkHash = checkHash # when size/mtime changed, compare content hashes before rebuilding the cache entry
+
+    ####### READING #######
+
+    def read(self, file_path, columns = None):
+        """returns the rows of a daily csv, served from the parquet cache when it is still valid.
+           Timestamps come back parsed as UTC. Only the requested columns are read from a cache hit.
+        """
+        cache_path, meta_path = self._paths(file_path)
+        if self.isValid(file_path):
+            return pd.read_parquet(cache_path, columns = columns)
+
+        rows = AISSchema.readCsv(file_path) # typed columns (categoricals, small ints, UTC timestamps) are kept by parquet
+        os.makedirs(os.path.dirname(cache_path), exist_ok = True)
+        rows.to_parquet(cache_path, index = False)
+        with open(meta_path, 'w') as f:
+            json.dump(FileSignature.signature(file_path, withHash = True), f)
+        return rows[columns] if columns else rows
+
+    ####### VALIDATION #######
+
+    def isValid(self, file_path):
+        """True if a cache entry exists for file_path and the csv has not changed since it was written"""
+        cache_path, meta_path = self._paths(file_path)
+        if not (os.path.exists(cache_path) and os.path.exists(meta_path)):
+            return False
+        with open(meta_path) as f:
+            cached = json.load(f)
+        current = FileSignature.signature(file_path)
+        if current['size'] == cached['size'] and current['mtime'] == cached['mtime']:
+            return True
+        if self.checkHash and current['size'] == cached['size'] and FileSignature.contentHash(file_path) == cached.get('sha1'):
+            with open(meta_path, 'w') as f: # same contents, only touched: refresh the stat so the next check is cheap
+                json.dump(dict(current, sha1 = cached['sha1']), f)
+            return True
+        return False
+
+    def _paths(self, file_path):
+        name = os.path.splitext(os.path.basename(file_path))[0]
+        return os.path.join(self.cacheFolder, name + '.parquet'), os.path.join(self.cacheFolder, name + '.json')
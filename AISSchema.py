@@ -0,0 +1,106 @@
+# Declared column types for AIS rows, applied at ingestion and kept through Cruise and BoatData concatenation
+import pandas as pd
+from pandas.api.types import CategoricalDtype
+
+from Slicer import Slicer
+
+
+class AISSchema():
+    # repeated strings become categoricals, measurements use the smallest type that holds them.
+    # lat/lon stay float64 so distances and geofence tests are unchanged, draught carries tenths of a metre so it stays a float.
+    DTYPES = {
+        'mmsi': 'Int32',
+        'callsign': 'category',
+        'imo': 'Int32',
+        'name': 'category',
+        'nav_status': 'category',
+        'lat': 'float64',
+        'lon': 'float64',
+        'cog': 'float32',
+        'sog': 'float32',
+        'destination': 'category',
+        'shiptype': 'category',
+        'draught': 'float32',
+        'length': 'Int16',
+        'width': 'Int16',
+    }
+    # parsed to datetime64[ns, UTC], stored as int64 epoch nanoseconds
+    TIMESTAMP_COLUMNS = ['bs_ts']
+    NAIVE_TIMESTAMP_COLUMNS = ['eta']
+
+    ####### ENFORCING #######
+
+    @staticmethod
+    def readCsv(file_path, columns = None):
+        """reads a daily csv directly into the declared types"""
+        dtypes = {column: dtype for column, dtype in AISSchema.DTYPES.items() if columns is None or column in columns}
+        rows = pd.read_csv(file_path, usecols = columns, dtype = dtypes)
+        return AISSchema.enforce(rows)
+
+    @staticmethod
+    def enforce(rows):
+        """casts rows to the declared schema. Columns already in the right type are left alone,
+           leftover csv index columns ('Unnamed: 0') are dropped.
+        """
+        rows = rows.drop(columns = [column for column in rows.columns if str(column).startswith('Unnamed')])
+        for column, dtype in AISSchema.DTYPES.items():
+            if column in rows.columns and rows[column].dtype != dtype:
+                rows[column] = rows[column].astype(dtype)
+        for column in AISSchema.TIMESTAMP_COLUMNS:
+            if column in rows.columns and not isinstance(rows[column].dtype, pd.DatetimeTZDtype):
+                rows[column] = Slicer.parseTimestamps(rows[column])
+        for column in AISSchema.NAIVE_TIMESTAMP_COLUMNS:
+            if column in rows.columns and rows[column].dtype == object:
+                rows[column] = pd.to_datetime(rows[column])
+        return rows
+
+    ####### CONCATENATING #######
+
+    @staticmethod
+    def concat(frames):
+        """pd.concat that keeps categorical columns categorical (categories are unioned first, plain pd.concat falls back to object)
+           and skips empty frames so they do not upcast the result. The column order of the input frames is kept.
+        """
+        columns = list(dict.fromkeys(column for frame in frames for column in frame.columns))
+        nonEmpty = [frame for frame in frames if len(frame) > 0]
+        if not nonEmpty:
+            return frames[0] if frames else pd.DataFrame()
+        if len(nonEmpty) > 1:
+            nonEmpty = AISSchema._unionCategories(nonEmpty)
+        result = pd.concat(nonEmpty, ignore_index = True)
+        if list(result.columns) != columns:
+            result = result[[column for column in columns if column in result.columns]]
+        return result
+
+    @staticmethod
+    def _unionCategories(frames):
+        categorical = [column for column in frames[0].columns if isinstance(frames[0][column].dtype, CategoricalDtype)]
+        for column in categorical:
+            dtypes = [frame[column].dtype for frame in frames if column in frame.columns]
+            if not all(isinstance(dtype, CategoricalDtype) for dtype in dtypes) or all(dtype == dtypes[0] for dtype in dtypes):
+                continue
+            dtype = CategoricalDtype(list(dict.fromkeys(category for dtype in dtypes for category in dtype.categories)))
+            recoded = []
+            for frame in frames:
+                if column in frame.columns and frame[column].dtype != dtype:
+                    frame = frame.copy(deep = False) # only the recoded column is replaced
+                    frame[column] = frame[column].astype(dtype)
+                recoded.append(frame)
+            frames = recoded
+        return frames
+
+    ####### MEMORY #######
+
+    @staticmethod
+    def memoryUsage(df):
+        """returns the deep memory footprint of df in MB"""
+        return df.memory_usage(deep = True).sum() / 1e6
+
+    @staticmethod
+    def reportMemory(stage, frames):
+        """prints the total memory held by a frame or list of frames at a named pipeline stage"""
+        if isinstance(frames, pd.DataFrame):
+            frames = [frames]
+        total = sum(AISSchema.memoryUsage(df) for df in frames)
+        print(f'{stage}: {total:0.1f} MB in {sum(len(df) for df in frames)} rows')
+        return total
@@ -3,6 +3,8 @@ from Geoprocessor import Geoprocessor
 from Slicer import Slicer
 import pandas as pd
 import geopandas as gpd
+import numpy as np
+import bisect
 import os
 import secrets
 import time
@@ -10,13 +12,15 @@ import matplotlib.pyplot as plt
 
 from typing import Dict
 from Cruise import Cruise
+from AISSchema import AISSchema
+from Segmenter import Segmenter
+from ReferenceLayers import ReferenceLayer
 from datetime import datetime
 from PathCalculations import PathCalculations
 import pytz
 
 class BoatData(AIS):
-    GLBA_BOUNDARY = gpd.read_file(r'./data/shapes/port_GLBA.shp')
-    GLBA_BOUNDARY = GLBA_BOUNDARY.set_crs(epsg=4326)
+    GLBA_BOUNDARY = ReferenceLayer('port_glba')
 
     def __init__(self, boatName):
         super().__init__()
@@ -24,6 +28,13 @@ class BoatData(AIS):
         self.boatName = boatName  # Store boat name
 
         self._previousCruise = None # Reference to the last Cruise edited
+        self._cruiseIndex = [] # (endTime as int64 ns, creation order, cruise_id) sorted by endTime, used to match groups by binary search
+        self.pointStore = None # set by BoatsData.finalize, serves flattenedCruises as a view while the cruises are unchanged
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['pointStore'] = None # pickled once per cruise, not again through the store
+        return state
 
     def __str__(self):
         string = ''
@@ -33,14 +44,22 @@ class BoatData(AIS):
     
     #### READING DATA ####
 
-    def flattenedCruises(self) -> gpd.GeoDataFrame:
+    def flattenedCruises(self, geometry = True) -> gpd.GeoDataFrame:
         """returns a summary of all the data together for the season.
+           Point geometry is built once for the whole season (vectorized), pass geometry=False when only lat/lon are needed.
         """
-        df = gpd.GeoDataFrame()
-        for cruise_id, cruise_data in self.cruisesDataDictionary.items():
-            df = pd.concat([df, cruise_data.data], ignore_index=True)
+        store = getattr(self, 'pointStore', None)
+        if store is not None and store.isCurrent(self):
+            df = store.vessel(self.boatName) # zero-copy view of the season store
+            return Geoprocessor.dataToGeodata(df) if geometry else df
+        frames = [cruise_data.data for cruise_id, cruise_data in self.cruisesDataDictionary.items()]
         #print('here is the flattened set of cruises')
-        return df
+        if not frames:
+            return gpd.GeoDataFrame()
+        df = AISSchema.concat(frames)
+        if 'geometry' in df.columns: # some cruises already built their points, the others would be missing
+            df = pd.DataFrame(df.drop(columns='geometry'))
+        return Geoprocessor.dataToGeodata(df) if geometry else df
     
     def aggregateGeodata(self): # not called
         """returns a flattened GeoDataFrame of all Cruise geodata from this boatData's cruiseDataDict
@@ -50,13 +69,32 @@ class BoatData(AIS):
 
     def isEmpty(self):
         return not self.cruisesDataDictionary
+
+    def finalize(self):
+        """concatenates the buffered groups of every cruise into its data"""
+        for cruise in self.cruisesDataDictionary.values():
+            cruise.concatenateDataList()
     
     #### IMPORTING DATA ####
 
-    def processGroup(self, group):
-        group = Slicer.orderGroupByTime(group) # convert group contents to AKDT and order as timestamps type
+    def processGroup(self, group, ordered = False):
+        if not ordered:
+            group = Slicer.orderGroupByTime(group) # convert group contents to AKDT and order as timestamps type
         self._sortAndAddGroupToDictionary(group)
 
+    def processSegmentedPings(self, pings, cruiseNumbers, groupKeys):
+        """Adds a season of time-ordered pings whose cruise numbers were assigned by Segmenter, one Cruise per run of numbers.
+           days records the first day of every source group in the cruise, as processGroup would.
+        """
+        for start, stop in Segmenter.segmentBounds(cruiseNumbers):
+            segment = pings.iloc[start:stop].reset_index(drop=True)
+            cruise = self._incrementCruisesDataDictionary()
+            self._addGroupToCruise(cruise, segment)
+
+            keys = groupKeys[start:stop]
+            group_starts = np.flatnonzero(np.concatenate([[True], keys[1:] != keys[:-1]]))
+            cruise.days = [ts.date() for ts in Slicer.toLocalTime(segment['bs_ts'].iloc[group_starts])]
+
     #### SORTING DATA HELPERS (These helper functions mutate the cruisesDataDictionary) ####
 
     def _sortAndAddGroupToDictionary(self, group: pd.DataFrame) -> None: 
@@ -71,12 +109,12 @@ class BoatData(AIS):
             #print(f'matched to previous')
             return
         
-        # ITERATE TO FIND THE MATCH THEN ADD
-        for cruise_id, cruise in self.cruisesDataDictionary.items():
-            if cruise.shouldGroupBeAdded(group):
-                self._addGroupToCruise(cruise, group)
-                print(f'searched and found matching cruise {cruise_id}')
-                return
+        # SEARCH THE INDEX FOR THE MATCH THEN ADD
+        cruise = self._findMatchingCruise(group)
+        if cruise is not None:
+            self._addGroupToCruise(cruise, group)
+            print(f'searched and found matching cruise {cruise.cruiseID}')
+            return
         
         # DEFAULT TO CREATING AND POPULATING AN EMPTY CRUISE
         newCruise = self._incrementCruisesDataDictionary()
@@ -91,6 +129,29 @@ class BoatData(AIS):
         self.cruisesDataDictionary[cruise_id] = Cruise(cruise_id)
         return self.cruisesDataDictionary[cruise_id]
 
+    def _findMatchingCruise(self, group: pd.DataFrame):
+        """Returns the earliest created cruise the group should be added to, or None.
+           A cruise matches when it ends no more than Cruise.TIMELAPSE_THRESHOLD before the group starts,
+           so the candidates are the suffix of the endTime-sorted index found by binary search.
+        """
+        earliest_end = (group['bs_ts'].min() - Cruise.TIMELAPSE_THRESHOLD).value
+        position = bisect.bisect_left(self._cruiseIndex, (earliest_end,))
+        candidates = self._cruiseIndex[position:]
+        if not candidates:
+            return None
+        _, _, cruise_id = min(candidates, key = lambda entry: entry[1]) # same choice as scanning cruises in creation order
+        return self.cruisesDataDictionary[cruise_id]
+
     def _addGroupToCruise(self, cruise, group) -> None:
+        previous_end = cruise.endTime
         cruise.addGroup(group)
-        self._previousCruise = cruise
\ No newline at end of file
+        self._previousCruise = cruise
+        self._updateCruiseIndex(cruise, previous_end)
+
+    def _updateCruiseIndex(self, cruise, previous_end) -> None:
+        """Moves the cruise's entry in _cruiseIndex to its new endTime."""
+        order = int(cruise.cruiseID.rsplit('_', 1)[-1])
+        if previous_end is not None:
+            position = bisect.bisect_left(self._cruiseIndex, (previous_end.value, order))
+            del self._cruiseIndex[position]
+        bisect.insort(self._cruiseIndex, (cruise.endTime.value, order, cruise.cruiseID))
\ No newline at end of file
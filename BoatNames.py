@@ -0,0 +1,210 @@
+# Canonical boat names: the berth code suffix rules of the CLAA schedules, and an alias index from names to vessel keys (MMSI/IMO)
+import os
+import re
+import pickle
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+
+class BoatNames():
+    # berth codes the schedule pdfs append to boat names, in precedence order: the first code of a list that matches is removed
+    BERTH_CODES = ['TEX', 'PTF', 'TWL', 'NHF', 'AS', 'MW', 'CTY', 'ANC', '3', 'CHL', 'AMP', 'POR',
+    'DDF', 'RRA', 'AJI', 'OA', 'C', 'AKR', 'WCT', 'AN3', 'AIF', 'ICT', 'WE', 'AN4', 'DW',
+    'ANR', 'CON', 'DTN', 'KLW', 'OF', 'ICL', 'STI', '1', 'AKE', 'WW', 'CT', '4',
+    '2CR', 'F', 'PIP', 'LTK', '1B', '1CR', '2', 'OSD', 'DYN', '3BR', 'LZ',
+    'PET', 'BRD', 'ALD', 'IWL', 'WP', 'DLY', 'WC2', 'IVF', 'AND',
+    'B3T', '3CR', 'SD', 'RR', 'WLD', 'TCL', 'ISD', 'ACT','AJD', 'RRF', 'ORE', '4CR', 'UMC',
+    'SHZ', 'ANH', 'OLD', 'CFT', '4BR', '2BR', 'D', 'STO', 'FKL', 'ASD', '1A', 'WC1', 'SLZ', '1BR', 'A', 'FRT', 'CHA']
+
+    ADDITIONAL_BERTH_CODES = ['ANC', 'CHL', 'PET', 'AKR', 'RRF', '2CR', 'AJD', 'AKE', 'ORE', 'AN3', 'AMP',
+                              'AS', 'BRD', 'CT', 'CTY', 'FKL', 'RRA', 'STO',
+                              'WE', 'WLD', 'WW', 'KLW', 'SD', '1', '2', '3', '4', '2BR', '3CR', '']
+
+    KEEP_ENDINGS = ('SEAS', 'SEA', 'BA') # names ending like this keep their suffix (OF THE SEAS, GLACIER BAY)
+    TRUNCATED_ENDINGS = ('EIGHD', 'EIGHF', 'TOA', 'TOO') # a berth letter glued to a name cut by the column width
+
+    VESSEL_CODES_PATH = r'./data/imo/imo-vessel-codes.csv' # imo, mmsi, name, flag, type
+    CACHE_FOLDER = r'./data/cache/names'
+    PREFIX_MIN_LENGTH = 15 # shorter names are never matched as a truncated prefix of a longer one
+
+    ####### SUFFIX RULES #######
+
+    @staticmethod
+    def suffixPattern(codes, separator = ''):
+        """compiles codes into one pattern matched at the start of a reversed name: the alternatives are tried longest
+           first, so a match is the longest code (preceded by separator) the name ends with
+        """
+        codes = sorted({code for code in codes if code}, key = len, reverse = True)
+        return re.compile('(?:' + '|'.join(re.escape(code[::-1]) for code in codes) + ')' + re.escape(separator))
+
+    @staticmethod
+    def precedence(codes):
+        """maps every code to the code the list order picks for names ending with it: its first suffix in codes"""
+        return {code: next(other for other in codes if other and code.endswith(other)) for code in codes if code}
+
+    _BERTH = None # the patterns and precedence of the codes, built below the class
+    _ADDITIONAL = None
+    _ADDITIONAL_PRECEDENCE = None
+
+    @staticmethod
+    @lru_cache(maxsize = None)
+    def clean(boatName):
+        """boat name of a schedule entry without its berth code, see BERTH_CODES"""
+        reversed_name = boatName[::-1]
+        keep = boatName.endswith(BoatNames.KEEP_ENDINGS)
+        match = None if keep else BoatNames._BERTH.match(reversed_name)
+        if match:
+            boatName = boatName[:len(boatName) - match.end() + 1] # the space before the code goes with the final rstrip
+        #CLEAN AGAIN FOR TRAILING BERTH CODES WRITTEN INCONSISTENTLY (NO SPACE BEFORE)
+        else:
+            match = None if keep else BoatNames._ADDITIONAL.match(reversed_name)
+            if match and not boatName.endswith('ENCORE'):
+                boatName = boatName[:len(boatName) - len(BoatNames._ADDITIONAL_PRECEDENCE[match.group()[::-1]])]
+        if boatName.endswith(BoatNames.TRUNCATED_ENDINGS):
+            boatName = boatName[:-1]
+        if boatName.endswith(' CHA'):
+            boatName = boatName[:-4]
+        return boatName.rstrip()
+
+    @staticmethod
+    @lru_cache(maxsize = None)
+    def normalize(name):
+        """upper case with single spaces, the form names are compared in"""
+        return ' '.join(str(name).upper().split())
+
+    ####### ALIAS INDEX #######
+
+    _state = None # {'signature', 'aliases'}, loaded from CACHE_FOLDER on first use
+    _registry = None # VESSEL_CODES_PATH with normalized names, read on the first name the index has not resolved
+
+    @staticmethod
+    def signature():
+        stat = os.stat(BoatNames.VESSEL_CODES_PATH)
+        return stat.st_size, stat.st_mtime_ns
+
+    @staticmethod
+    def _cachePath():
+        return os.path.join(BoatNames.CACHE_FOLDER, 'registry-aliases.pkl')
+
+    @staticmethod
+    def state():
+        """names resolved through the vessel codes, persisted in CACHE_FOLDER. Aliases are dropped when the vessel codes change"""
+        if BoatNames._state is None:
+            state = None
+            if os.path.exists(BoatNames._cachePath()):
+                with open(BoatNames._cachePath(), 'rb') as f:
+                    state = pickle.load(f)
+            if state is None or state['signature'] != BoatNames.signature():
+                state = {'signature': BoatNames.signature(), 'aliases': {}}
+            BoatNames._state = state
+        return BoatNames._state
+
+    @staticmethod
+    def _save():
+        os.makedirs(BoatNames.CACHE_FOLDER, exist_ok = True)
+        with open(BoatNames._cachePath(), 'wb') as f:
+            pickle.dump(BoatNames._state, f, protocol = pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def observe(data):
+        """name -> mmsi/imo pairs of AIS pings (a frame with name and mmsi columns, imo optional) with their ping counts,
+           sorted by name. Nothing is kept: callers pass the result to vesselKeys for the season they join. Empty when
+           the pings were loaded without names or mmsi (see App columns)
+        """
+        if 'name' not in data.columns or 'mmsi' not in data.columns:
+            return pd.DataFrame({'name': pd.Series(dtype = object), 'mmsi': pd.Series(dtype = 'Int64'),
+                                 'imo': pd.Series(dtype = 'Int64'), 'pings': pd.Series(dtype = 'int64')})
+        pings = pd.DataFrame({'name': data['name'], 'mmsi': data['mmsi'].astype('Int64'),
+                              'imo': data['imo'].astype('Int64') if 'imo' in data.columns else pd.NA}).dropna(subset = ['name', 'mmsi'])
+        seen = pings.groupby(['name', 'mmsi'], observed = True).agg(imo = ('imo', 'first'), pings = ('imo', 'size')).reset_index()
+        seen['name'] = seen['name'].astype(object).map(BoatNames.normalize) # once per distinct name, not per ping
+        seen = seen.groupby(['name', 'mmsi'], as_index = False).agg(imo = ('imo', 'first'), pings = ('pings', 'sum'))
+        return seen.astype({'imo': 'Int64', 'pings': 'int64'})
+
+    @staticmethod
+    def registry():
+        if BoatNames._registry is None:
+            codes = pd.read_csv(BoatNames.VESSEL_CODES_PATH, dtype = {'imo': 'Int64', 'mmsi': 'Int64'}).dropna(subset = ['name', 'mmsi'])
+            codes['name'] = codes['name'].map(BoatNames.normalize)
+            codes['passenger'] = codes['type'].fillna('').str.contains('Passenger')
+            BoatNames._registry = codes.drop_duplicates(['name', 'mmsi']).sort_values('name', kind = 'stable').reset_index(drop = True)
+        return BoatNames._registry
+
+    @staticmethod
+    def candidates(table, name, prefix = False):
+        """rows of a table sorted by name whose name is name, or starts with it"""
+        names = table['name'].to_numpy(dtype = object)
+        lo = np.searchsorted(names, name, side = 'left')
+        hi = np.searchsorted(names, name + '\uffff' if prefix else name, side = 'right')
+        return table.iloc[lo:hi]
+
+    @staticmethod
+    def resolve(name):
+        """(mmsi, imo, source) of a name in the vessel codes: the only vessel (passenger vessels first) of that name,
+           else the only vessel whose name starts with it, for the schedule names cut by the pdf column width.
+           (None, None, None) when nothing or more than one vessel fits
+        """
+        name = BoatNames.normalize(name)
+        registry = BoatNames.registry()
+        for prefix in [False, True]:
+            if prefix and len(name) < BoatNames.PREFIX_MIN_LENGTH:
+                break
+            known = BoatNames.candidates(registry, name, prefix)
+            if known['mmsi'].nunique() > 1:
+                known = known[known['passenger']]
+            if known['mmsi'].nunique() == 1:
+                return int(known['mmsi'].iloc[0]), None if pd.isna(known['imo'].iloc[0]) else int(known['imo'].iloc[0]), 'registry prefix' if prefix else 'registry'
+        return None, None, None
+
+    @staticmethod
+    def resolveObserved(observed, name, prefix = False):
+        """(mmsi, imo, source) of the most pinged mmsi broadcast under name in observed (see observe), or under the
+           names starting with it when they all carry one mmsi. None when nothing fits
+        """
+        seen = BoatNames.candidates(observed, name, prefix)
+        if len(seen) and (not prefix or seen['mmsi'].nunique() == 1):
+            best = seen.sort_values('pings', ascending = False, kind = 'stable').iloc[0]
+            return int(best['mmsi']), None if pd.isna(best['imo']) else int(best['imo']), 'ais prefix' if prefix else 'ais'
+        return None
+
+    @staticmethod
+    def aliases(names, observed = None):
+        """alias index rows (name, mmsi, imo, source) of names. A name observed in AIS (see observe) resolves to the mmsi
+           it was broadcast with, before the vessel codes; the exact vessel code name comes before an observed prefix.
+           The vessel code aliases are resolved once and persisted, observed ones only hold for this call
+        """
+        state = BoatNames.state()
+        names = pd.unique(pd.Series(names, dtype = object).dropna().map(BoatNames.normalize))
+        missing = [name for name in names if name not in state['aliases']]
+        for name in missing:
+            state['aliases'][name] = BoatNames.resolve(name)
+        if missing:
+            BoatNames._save()
+        rows = []
+        for name in names:
+            alias = state['aliases'][name]
+            if observed is not None and len(observed):
+                seen = BoatNames.resolveObserved(observed, name)
+                if seen is None and alias[2] != 'registry' and len(name) >= BoatNames.PREFIX_MIN_LENGTH:
+                    seen = BoatNames.resolveObserved(observed, name, prefix = True)
+                alias = seen or alias
+            rows.append((name,) + alias)
+        return pd.DataFrame(rows, columns = ['name', 'mmsi', 'imo', 'source'])
+
+    @staticmethod
+    def vesselKeys(names, observed = None):
+        """join key of every name in names (NA for missing names): 'mmsi:<mmsi>' for names resolved to a vessel, else
+           'name:<normalized name>', so unresolved and ambiguous names still match the same name on the other side.
+           observed: name -> mmsi pairs of the AIS season being joined, see observe
+        """
+        names = pd.Series(names, dtype = object)
+        aliases = BoatNames.aliases(names.unique(), observed)
+        keys = ['name:' + name if pd.isna(mmsi) else f'mmsi:{int(mmsi)}' for name, mmsi in zip(aliases['name'], aliases['mmsi'])]
+        return names.map(BoatNames.normalize, na_action = 'ignore').map(dict(zip(aliases['name'], keys)))
+
+
+BoatNames._BERTH = BoatNames.suffixPattern(BoatNames.BERTH_CODES, ' ')
+BoatNames._ADDITIONAL = BoatNames.suffixPattern(BoatNames.ADDITIONAL_BERTH_CODES)
+BoatNames._ADDITIONAL_PRECEDENCE = BoatNames.precedence(BoatNames.ADDITIONAL_BERTH_CODES)
@@ -2,9 +2,20 @@ from BoatData import BoatData
 from Statistics import Statistics
 from PortManager import PortManager
 from Cruise import Cruise
+from Ingestor import Ingestor
+from AISSchema import AISSchema
+from Segmenter import Segmenter
+from Slicer import Slicer
+from GeofenceEvents import GeofenceEvents
+from VisitAnalyzer import VisitAnalyzer
+from ReferenceLayers import ReferenceLayer
+from PointStore import PointStore
+from IntervalJoin import IntervalJoin
+from BoatNames import BoatNames
 
 import pandas as pd
 import geopandas as gpd
+import numpy as np
 from Geoprocessor import Geoprocessor
 
 import os
@@ -13,20 +24,26 @@ import time
 import matplotlib.pyplot as plt
 from datetime import datetime
 from PathCalculations import PathCalculations
+from Slicer import Slicer
 import pytz
 
 #from ship import *
 
 class BoatsData:
-    CLAA_DATA = pd.read_csv(r'./data/calendar/allyears_allports_claa.csv')
-    ALASKA_COASTLINE = gpd.read_file(r'./data/shapes/Alaska_Coastline/Alaska_Coastline.shp')
-    ALASKA_COASTLINE_ALBERS = ALASKA_COASTLINE.to_crs(epsg=3338)
-    ALASKA_COASTLINE_WGS84 = ALASKA_COASTLINE.to_crs(epsg=4326)
+    CLAA_DATA_FILEPATH = r'./data/calendar/allyears_allports_claa.csv' # written by CalendarParser, read on first use, see claaData
+    _claaData = None
+    CLAA_TOLERANCE = pd.Timedelta(hours = 1) # slack between scheduled (CLAA) and observed (AIS) times of a call
+    CLAA_INDEX_CACHE_SIZE = 2 # claaIndex keeps the indexes of the most recent frames, e.g. a season and a subset of it
+    _claaIndexes = {} # (id of the CLAA frame, tolerance, observed names) -> (frame, IntervalJoin), least recently used first
+    ALASKA_COASTLINE = ReferenceLayer('alaska_coastline') # loaded on first access, see ReferenceLayers
+    ALASKA_COASTLINE_ALBERS = ReferenceLayer('alaska_coastline', 3338)
+    ALASKA_COASTLINE_WGS84 = ReferenceLayer('alaska_coastline', 4326)
 
     def __init__(self):
         self.boatsDataDictionary = {}  # Dictionary to store BoatData instances
         self.previousBoatName = ""
         self.nanData = []  # To store rows with NaN values
+        self.pointStore = None # season-wide store built by finalize, see PointStore
 
     def __str__(self):
         string = ""
@@ -38,10 +55,13 @@ class BoatsData:
         """Reads tabular data as rows, sorting them into NaN, and other BoatData Objects.
            The rows are assigned to particular Cruise objects within that Class and stored as such.
         """
-        grouped = rows.groupby('name', dropna = False)
-        
-        for boatName, group in grouped:
-            group = group.sort_values(by='bs_ts', ascending=True)
+        self.parseGroups(Ingestor.groupRows(rows))
+
+    def parseGroups(self, groups):
+        """Sorts (boatName, group) pairs from Ingestor.groupRows into NaN and BoatData Objects.
+           Named groups are expected to already be ordered by time.
+        """
+        for boatName, group in groups:
             if pd.isna(boatName):
                 self.nanData.extend(group.values.tolist())
                 continue
@@ -49,104 +69,80 @@ class BoatsData:
             if boatName not in self.boatsDataDictionary or not boatName:
                 self.boatsDataDictionary[boatName] = BoatData(boatName)
             
-            self.boatsDataDictionary[boatName].processGroup(group)
-
-    def initializeStatistics(self):
-        self.statistics = Statistics(self)
-
-    def flatten(self):
-        df = pd.DataFrame()
-        for _, boat_data in self.boatsDataDictionary.items():
-            df = pd.concat([df, boat_data.flattenedCruises()], ignore_index = True)
-        return df
-
-    def run_glba_workflow(self):
-        count_glba_visits = 0
-        visit_table = pd.DataFrame()
-        ais_data_glba_to_next_port = gpd.GeoDataFrame()
-        new_rows = []
-        filtered_data = []
-        for boatName, boatData in self.boatsDataDictionary.items():
-            print(f'processing {boatName}')
-            data = boatData.flattenedCruises()
-
-            data = PortManager.populate_status_and_ports(data)
-            data = PortManager.identify_status_changes(data)
-
-            within_glba = Geoprocessor.clip2(data, Geoprocessor.GLBA_BOUNDARY) # change this to be based on condition set during original check.
-            
-            grouped = within_glba.groupby('segment_id')
-            for segment_id, group in grouped: # create summary row for each segment of points within GLBA
-                ### enumerate segments to calculate metrics ###
-                start_index, end_index = group.index[0], group.index[-1] # index of last point in GLBA boundary -> specify 'exit line'
-                ts_in, ts_out = min(group.bs_ts), max(group.bs_ts)
-
-                start_index_next_port = data[data['segment_id'] == segment_id].index[-1] + 1
-                end_index_previous_port = data[data['segment_id'] == segment_id].index[0] - 1
-                #PortManager.getFirstIndexInNextPort(data, end_index)
-                #end_index_previous_port = PortManager.getLastIndexInPrevPort(data, start_index)
-
-
-                ###### CALCULATE STATISTICS FROM GLBA EXIT -> NEXT PORT #######
+            self.boatsDataDictionary[boatName].processGroup(group, ordered = True)
 
-                sub_between_glba_next_port = data.iloc[end_index+1 : start_index_next_port-1] # takes from point after last one in GLBA and up to one before mooring in the next port
-                filtered_data.append(Geoprocessor.dataToGeodata(sub_between_glba_next_port))
-                #print(f'added data of len {len(filtered_data[-1])} and type {type(filtered_data[-1])}')
+    def parseSeason(self, fileGroups, workers = 1):
+        """Vectorized alternative to calling parseGroups once per file.
+           Collects every file's groups per boat, sorts each boat's pings once and assigns cruise IDs with
+           Segmenter in a single pass per vessel (vessels are segmented in parallel with more than one worker).
+           Breaks are only placed between files, so in-order archives get the same {boat}_{nn} cruises as parseGroups.
+        """
+        parts = {}
+        for ordinal, groups in enumerate(fileGroups):
+            for boatName, group in groups:
+                if pd.isna(boatName):
+                    self.nanData.extend(group.values.tolist())
+                    continue
+                parts.setdefault(boatName, []).append((ordinal, group))
+
+        seasons = {}
+        for boatName, boatParts in parts.items():
+            pings = AISSchema.concat([group for _, group in boatParts])
+            groupKeys = np.repeat([ordinal for ordinal, _ in boatParts], [len(group) for _, group in boatParts])
+            order = np.argsort(pings['bs_ts'].values, kind = 'stable') # already sorted unless files overlap in time
+            seasons[boatName] = (pings.take(order).reset_index(drop = True), groupKeys[order])
+        parts.clear()
+
+        fleet = {boatName: (pings['bs_ts'].values.astype('datetime64[ns]').astype(np.int64), groupKeys) for boatName, (pings, groupKeys) in seasons.items()}
+        cruiseNumbers = Segmenter.segmentFleet(fleet, Cruise.TIMELAPSE_THRESHOLD, workers)
+
+        for boatName, (pings, groupKeys) in seasons.items():
+            if boatName not in self.boatsDataDictionary:
+                self.boatsDataDictionary[boatName] = BoatData(boatName)
+            self.boatsDataDictionary[boatName].processSegmentedPings(pings, cruiseNumbers[boatName], groupKeys)
 
-                mean_sog = Statistics.mean(sub_between_glba_next_port, 'sog')
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['pointStore'] = None # the cruises pickle their own rows, finalize rebuilds the store after loading
+        return state
 
-                portBefore = group['previous_port'].iloc[-1]
-                portAfter = group['next_port'].iloc[-1]
+    def finalize(self):
+        """concatenates each cruise's buffered groups once, after all files are parsed, then moves all cruises into one PointStore"""
+        for boat_data in self.boatsDataDictionary.values():
+            boat_data.finalize()
+        self.pointStore = PointStore.build(self)
+        for boat_data in self.boatsDataDictionary.values():
+            boat_data.pointStore = self.pointStore
 
-                max_speed = sub_between_glba_next_port['sog'].max()
+    def initializeStatistics(self):
+        self.statistics = Statistics(self)
 
-                try:
-                    arrival_in_next_port = data.bs_ts.iloc[start_index_next_port]
-                    timelapse_to_next_port = PathCalculations.timelapseAlongPath(data.bs_ts, end_index, start_index_next_port)
-                    _, distance_to_next_port = PathCalculations.distanceAlongPath_nm(data.geometry, end_index, start_index_next_port)
-    
-                    timelapse_from_previous_port = PathCalculations.timelapseAlongPath(data.bs_ts, end_index_previous_port, start_index)
-                    _, distance_from_previous_port = PathCalculations.distanceAlongPath_nm(data.geometry, end_index_previous_port, start_index)
-                except IndexError:
-                    print(f"Warning: start_index_next_port {start_index_next_port} is out of bounds. Assigning default values for {boatName}.")
-                    arrival_in_next_port = None  # Assigning None or a default value, e.g., pd.Timestamp('NaT')
-                    timelapse_to_next_port = None
-                    distance_to_next_port = None
-                    timelapse_from_previous_port = None
-                    distance_from_previous_port = None
-
-                new_row = {
-                        'date' : list(set(group.bs_ts.dt.date)),
-                        'boatName': boatName,
-                        'mmsi' : 'num',
-                        'portAfter': str(portAfter),
-                        'portBefore': str(portBefore),
-                        'ts_in': ts_in,
-                        'ts_out': ts_out,
-                        'timeTo' : timelapse_to_next_port,
-                        'distTo' : distance_to_next_port,
-                        'mean_sog' : mean_sog,
-                        'max_sog' : max_speed,
-                        #'calc_kts' : distance_to_next_port/timelapse_to_next_port
-                        #'arrival' : arrival_in_next_port,
-                        #'timeFrom' : timelapse_from_previous_port,
-                        #'distFrom' : distance_from_previous_port,
-                        'segment_id': segment_id
-                }
-                new_rows.append(new_row)
-                count_glba_visits += 1
-
-        if new_rows:
-            visit_table = pd.concat([visit_table, pd.DataFrame(new_rows)], ignore_index=True)
-
-        if len(filtered_data) > 0:
-            ais_data_glba_to_next_port = pd.concat(
-                [gpd.GeoDataFrame(df, geometry='geometry', crs="EPSG:4326") for df in filtered_data], 
-                ignore_index=True
-            )
-            #ais_data_glba_to_next_port = pd.concat([ais_data_glba_to_next_port, gpd.GeoDataFrame(filtered_data)])
-
-        merged = BoatsData.merge_ais_claa_data(visit_table, BoatsData.CLAA_DATA)
+    def flatten(self, geometry = True):
+        store = getattr(self, 'pointStore', None)
+        if store is not None and all(store.isCurrent(boat_data) for boat_data in self.boatsDataDictionary.values()) and len(store.vessels) == len(self.boatsDataDictionary):
+            df = store.season() # zero-copy view of every cruise
+            return Geoprocessor.dataToGeodata(df) if geometry and len(df) else df
+        frames = [boat_data.flattenedCruises(geometry = False) for _, boat_data in self.boatsDataDictionary.items()]
+        df = AISSchema.concat(frames) if frames else pd.DataFrame()
+        return Geoprocessor.dataToGeodata(df) if geometry and len(df) else df
+
+    def geofenceEvents(self, fences = GeofenceEvents.FENCES):
+        """enter/exit events of every vessel against fences, one vectorized pass over each vessel's season of pings"""
+        tables = [GeofenceEvents.extract(boatData.flattenedCruises(geometry = False), fences, vessel = boatName) for boatName, boatData in self.boatsDataDictionary.items()]
+        return pd.concat(tables, ignore_index = True) if tables else pd.DataFrame(columns = GeofenceEvents.COLUMNS)
+
+    def memoryUsage(self):
+        """returns the memory held by all Cruise data frames in MB"""
+        return sum(AISSchema.memoryUsage(cruise.data) for boat_data in self.boatsDataDictionary.values() for cruise in boat_data.cruisesDataDictionary.values())
+
+    def run_glba_workflow(self, workers = 1):
+        """GLBA visit table of the season, the single area case of VisitAnalyzer. workers is passed to VisitAnalyzer.run"""
+        visit_table, ais_data_glba_to_next_port = VisitAnalyzer({'GLBA': Geoprocessor.GLBA_BOUNDARY}).run(self, workers)
+        visit_table = visit_table.drop(columns = 'area', errors = 'ignore')
+        ais_data_glba_to_next_port = ais_data_glba_to_next_port.drop(columns = 'area', errors = 'ignore')
+        count_glba_visits = len(visit_table)
+
+        merged = BoatsData.merge_ais_claa_data(visit_table, BoatsData.claaData(), pings = self.flatten(geometry = False))
         
         visit_count_table = visit_table.boatName.value_counts()
         popular_next_ports_table = visit_table.portAfter.value_counts()
@@ -160,23 +156,58 @@ class BoatsData:
         
         return visit_table.sort_values(by='ts_in').reset_index(), ais_data_glba_to_next_port, visit_count_table, popular_next_ports_table, merged, count_glba_visits
 
+    @staticmethod
+    def claaData():
+        """the CLAA schedules of every year and port (CLAA_DATA_FILEPATH), read once"""
+        if BoatsData._claaData is None:
+            BoatsData._claaData = pd.read_csv(BoatsData.CLAA_DATA_FILEPATH)
+        return BoatsData._claaData
+
     def import_claa_data(self):
-        claa_df = pd.read_csv(BoatsData.CLAA_DATA_FILEPATH)
+        claa_df = BoatsData.claaData().copy()
         claa_df['year'] = pd.to_datetime(claa_df['date']).dt.year
         claa_df = claa_df[['date','year','boatName','portName','nextPort','ts_in','ts_out']]
         self.claa_data = claa_df
     
     @staticmethod
-    def merge_ais_claa_data(data, claa_df):
-        data['date'] = pd.to_datetime(data['date'].apply(lambda x: x[0] if isinstance(x, list) else x))
-        #data['date'] = pd.to_datetime(data['date'])
-        claa_df['date'] = pd.to_datetime(claa_df['date'])
-        merged = data.merge(claa_df,
-                            on=['boatName', 'date'], how='inner', suffixes=('_ais', '_claa'))
+    def merge_ais_claa_data(data, claa_df, tolerance = CLAA_TOLERANCE, pings = None):
+        """pairs every AIS visit with the CLAA calls of the same vessel whose scheduled [ts_in, ts_out] overlaps the visit,
+           give or take tolerance. Vessels are matched on mmsi, or on name where it does not resolve to one (see
+           BoatNames.vesselKeys), times as Alaska wall time, the CLAA schedule's. date is the visit's first day.
+           pings are the AIS pings of the season the visits come from: the names they were broadcast with resolve to
+           their mmsi first. Without them, or without their name and mmsi columns, names resolve through the vessel
+           codes only
+        """
+        observed = BoatNames.observe(pings) if pings is not None else None
+        dates = data['date'].explode() # visits spanning midnight carry a list of dates
+        ais = data.assign(date = pd.to_datetime(dates[~dates.index.duplicated()]),
+                          local_in = Slicer.toLocalTime(data['ts_in']).dt.tz_localize(None),
+                          local_out = Slicer.toLocalTime(data['ts_out']).dt.tz_localize(None),
+                          vessel = BoatNames.vesselKeys(data['boatName'], observed))
+        merged = BoatsData.claaIndex(claa_df, tolerance, observed).join(ais, 'local_in', 'local_out', suffixes=('_ais', '_claa'))
+        merged = merged.rename(columns = {'boatName_ais': 'boatName'})
         return merged[['date', 'boatName',
                        'portAfter', 'nextPort', 'portBefore', #'prevPort',
                        'ts_in_ais', 'ts_in_claa', 'ts_out_ais', 'ts_out_claa']]
 
+    @staticmethod
+    def claaIndex(claa_df, tolerance = CLAA_TOLERANCE, observed = None):
+        """interval index of the CLAA calls by vessel key on their scheduled times, the whole day of the call where a time
+           is unknown. Built once per frame, tolerance and observed AIS names (see BoatNames.observe)
+        """
+        key = (id(claa_df), tolerance, None if observed is None else tuple(observed.itertuples(index = False)))
+        cached = BoatsData._claaIndexes.pop(key, None) # the cached frame stays alive, so its id cannot be reused
+        if cached is None:
+            day = pd.to_datetime(claa_df['date'])
+            calls = claa_df.drop(columns = 'date').assign(call_in = pd.to_datetime(claa_df['ts_in'], errors = 'coerce').fillna(day), # 'unknown' times span the whole day of the call
+                                                     call_out = pd.to_datetime(claa_df['ts_out'], errors = 'coerce').fillna(day + pd.Timedelta(days = 1)),
+                                                     vessel = BoatNames.vesselKeys(claa_df['boatName'], observed))
+            cached = (claa_df, IntervalJoin(calls, 'vessel', 'call_in', 'call_out', tolerance))
+        BoatsData._claaIndexes[key] = cached # reinserted last: most recently used
+        while len(BoatsData._claaIndexes) > BoatsData.CLAA_INDEX_CACHE_SIZE:
+            del BoatsData._claaIndexes[next(iter(BoatsData._claaIndexes))]
+        return cached[1]
+
     @staticmethod
     def filter_claa_data_by_year(data, year):
         return data[data['year'] == year]
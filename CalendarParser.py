@@ -1,7 +1,13 @@
 import pdfplumber
 import pandas as pd
+import numpy as np
 import os
+import json
+import argparse
+from concurrent.futures import ProcessPoolExecutor
 from PortCodeParser import *
+from FileSignature import FileSignature
+from BoatNames import BoatNames
 from datetime import datetime, time
 
 ##### HELPER FUNCTIONS #####
@@ -37,19 +43,7 @@ def convertToTimestamp(date_obj, time_str):
     return pd.Timestamp.combine(date_obj, pd.to_datetime(time_str, format='%H:%M').time())
 
 def cleanBoatName(boatName):
-    berth_code = next((code for code in CalendarParser.BERTH_CODES if ((boatName.endswith(' ' + code)) and not (boatName.endswith('SEAS') or boatName.endswith('SEA') or boatName.endswith('BA')))), None)
-    #print(berth_code)
-    if berth_code:
-        boatName = boatName.removesuffix(berth_code)
-    #CLEAN AGAIN FOR TRAILING BERTH CODES WRITTEN INCONSISTENTLY (NO SPACE BEFORE)    
-    berth_code = next((code for code in CalendarParser.ADDITIONAL_BERTH_CODES if ((boatName.endswith(code)) and not (boatName.endswith('SEAS') or boatName.endswith('SEA') or boatName.endswith('BA')))), None)
-    if berth_code and not boatName.endswith('ENCORE'):
-        boatName = boatName.removesuffix(berth_code)
-    if boatName.endswith('EIGHD') or boatName.endswith('EIGHF') or boatName.endswith('TOA') or boatName.endswith('TOO'):
-        boatName = boatName[:-1]
-    if boatName.endswith(' CHA'):
-        boatName = boatName[:-4]
-    return boatName.rstrip()
+    return BoatNames.clean(boatName)
 
 ############################
 
@@ -67,23 +61,22 @@ class CalendarParser:
                     'VIC': 'VICTORIA', 'WHT': 'WHITTIER', 'WRG': 'WRANGELL', 'YAK': 'YAKUTAT'
     }
 
-    BERTH_CODES = ['TEX', 'PTF', 'TWL', 'NHF', 'AS', 'MW', 'CTY', 'ANC', '3', 'CHL', 'AMP', 'POR',
-    'DDF', 'RRA', 'AJI', 'OA', 'C', 'AKR', 'WCT', 'AN3', 'AIF', 'ICT', 'WE', 'AN4', 'DW',
-    'ANR', 'CON', 'DTN', 'KLW', 'OF', 'ICL', 'STI', '1', 'AKE', 'WW', 'CT', '4',
-    '2CR', 'F', 'PIP', 'LTK', '1B', '1CR', '2', 'OSD', 'DYN', '3BR', 'LZ', 
-    'PET', 'BRD', 'ALD', 'IWL', 'WP', 'DLY', 'WC2', 'IVF', 'AND',
-    'B3T', '3CR', 'SD', 'RR', 'WLD', 'TCL', 'ISD', 'ACT','AJD', 'RRF', 'ORE', '4CR', 'UMC',
-    'SHZ', 'ANH', 'OLD', 'CFT', '4BR', '2BR', 'D', 'STO', 'FKL', 'ASD', '1A', 'WC1', 'SLZ', '1BR', 'A', 'FRT', 'CHA']
+    BERTH_CODES = BoatNames.BERTH_CODES # suffix rules compiled in BoatNames
+    ADDITIONAL_BERTH_CODES = BoatNames.ADDITIONAL_BERTH_CODES
 
-    ADDITIONAL_BERTH_CODES = ['ANC', 'CHL', 'PET', 'AKR', 'RRF', '2CR', 'AJD', 'AKE', 'ORE', 'AN3', 'AMP',
-                              'AS', 'BRD', 'CT', 'CTY', 'FKL', 'RRA', 'STO',
-                              'WE', 'WLD', 'WW', 'KLW', 'SD', '1', '2', '3', '4', '2BR', '3CR', '']
+    COLUMNS = ['date', 'boatName', 'portCode', 'ts_in', 'ts_out']
+
+    SCHEDULES_FOLDER = r'./data/calendar/historical_cruise_schedules' # one <year>_allports_claa.pdf per season
+    CACHE_FOLDER = r'./data/cache/calendar' # page tables by pdf content hash, and built.json, see rebuild
+    ALLYEARS_PATH = r'./data/calendar/allyears_allports_claa.csv'
+    GROUPSTATS_PATH = r'./data/calendar/allyears_allports_claa_groupstats.csv'
                   
     def __init__(self, pdf_path, csv_path, year):
         self.pdf_path = pdf_path
         self.csv_path = csv_path
         self.year = year
-        self.df = pd.DataFrame(columns=['date', 'boatName', 'portCode', 'ts_in', 'ts_out'])
+        self.df = pd.DataFrame(columns=CalendarParser.COLUMNS)
+        self.rows = [] # parsed rows waiting to be added to self.df, see buildTable
 
     def groupElementsByTwo(self, elements):
         if len(elements) < 2 or len(elements) % 2 != 0:
@@ -130,7 +123,7 @@ class CalendarParser:
         }
         #print(new_row)
 
-        self.df = pd.concat([self.df, pd.DataFrame([new_row])], ignore_index=True)
+        self.rows.append(new_row)
 
     def populateDataTable_old(self, date, parsed_cruise):
         parsed_times = list(parseTimestamp(parsed_cruise[2]))
@@ -150,114 +143,149 @@ class CalendarParser:
                 'ts_in': pd.Timestamp.combine(pd.to_datetime(date), parsed_times[0]),
                 'ts_out' : pd.Timestamp.combine(pd.to_datetime(date), parsed_times[1])
             }
-        self.df = pd.concat([self.df, pd.DataFrame([new_row])], ignore_index=True)
+        self.rows.append(new_row)
+
+    def buildTable(self):
+        """adds the buffered rows to self.df with a single concat"""
+        if self.rows:
+            rows = pd.DataFrame(self.rows, columns=CalendarParser.COLUMNS)
+            self.df = pd.concat([self.df, rows], ignore_index=True) if len(self.df) else rows
+            self.rows = []
     
-    def processPDF(self):
+    def extractTables(self, content_hash = None):
+        """returns the table of every page of the pdf (None where there is none), cached in CACHE_FOLDER under the
+           hash of the pdf's contents so a pdf is only ever read by pdfplumber once
+        """
+        cache_path = os.path.join(CalendarParser.CACHE_FOLDER, (content_hash or FileSignature.contentHash(self.pdf_path)) + '.json')
+        if os.path.exists(cache_path):
+            with open(cache_path) as f:
+                return json.load(f)
+        tables = []
         with pdfplumber.open(self.pdf_path) as pdf:
             for count, page in enumerate(pdf.pages):
-                print(f'Displaying page {count}')
-                tables = page.extract_table()
-                if tables is None:
-                    print('Table is None')
-                    continue
-                for row in tables[0]:
-                    lines = row.split('\n')
-                    date = ' '.join(lines[0].split(' ')[1:]) + ' ' + str(self.year)
-                    lines = lines[1:] # continue with data after Date is stored
-                    cruises = self.groupElementsByTwo(lines)
-                    for cruise in cruises:
-                        parsed = self.parseItineraryCode(cruise)
-                        self.populateDataTable(date, parsed)
-                        
-                        print(f'Cruises data on {date}: {parsed}')
-                        print(f'original : {cruise[0]}')
+                print(f'Extracting page {count}')
+                tables.append(page.extract_table())
+        os.makedirs(CalendarParser.CACHE_FOLDER, exist_ok = True)
+        with open(cache_path, 'w') as f:
+            json.dump(tables, f)
+        return tables
+
+    def processPDF(self, content_hash = None):
+        for count, tables in enumerate(self.extractTables(content_hash)):
+            print(f'Displaying page {count}')
+            if tables is None:
+                print('Table is None')
+                continue
+            for row in tables[0]:
+                lines = row.split('\n')
+                date = ' '.join(lines[0].split(' ')[1:]) + ' ' + str(self.year)
+                lines = lines[1:] # continue with data after Date is stored
+                cruises = self.groupElementsByTwo(lines)
+                for cruise in cruises:
+                    parsed = self.parseItineraryCode(cruise)
+                    self.populateDataTable(date, parsed)
+                    
+                    print(f'Cruises data on {date}: {parsed}')
+                    print(f'original : {cruise[0]}')
+        self.buildTable()
     
     def convertCodesToNames(self):
-        self.df['portName'] = self.df['portCode'].apply(lambda code: CalendarParser.PORT_CODES.get(code, 'Unknown'))
+        self.df['portName'] = self.df['portCode'].map(CalendarParser.PORT_CODES).fillna('Unknown')
 
     def fillNextPorts(self):
-        #Needs work as boatNames are not yet cleaned
-        self.df['nextPort'] = None
-        for index, row in self.df.iterrows():
-            boatName = row['boatName']
-            next_index = self.df.index[(self.df['boatName'] == boatName) & (self.df.index > index)].tolist()
-            if next_index:
-                self.df.loc[index, 'nextPort'] = self.df.loc[next_index[0], 'portName']
+        """the port of each boat's next row, None on its last row"""
+        next_ports = self.df.groupby('boatName', sort=False)['portName'].shift(-1)
+        self.df['nextPort'] = next_ports.astype(object).where(next_ports.notna(), None)
 
     def createDailyRows(self):
         """Since each boat should have one daily entry, this method populates the self.df 
            with new rows when boats do not log a port of call and are therefor At Sea
         """
-        grouped = self.df.groupby(['boatName'], dropna = True)
-        new_rows = []
-
-        for boatName, group in grouped:
-            group = group.sort_values(by='date').reset_index(drop=True)
-            date_range = pd.date_range(start=group['date'].min(), end=group['date'].max())
-
-            for date in date_range:
-                if date not in group['date'].values:
-                    new_row = {
-                        'date': date,
-                        'boatName': boatName,
-                        'portCode': 'AS',
-                        'ts_in': pd.to_datetime(f"{date} 06:00"),
-                        'ts_out': pd.to_datetime(f"{date} 22:00")
-                    }
-                    new_rows.append(new_row)
-
-        if new_rows:
-            new_df = pd.DataFrame(new_rows)
+        if self.df.empty:
+            return
+        span = self.df.groupby('boatName', dropna = True)['date'].agg(['min', 'max'])
+        days = (span['max'] - span['min']).dt.days.to_numpy() + 1
+        offsets = np.arange(days.sum()) - np.repeat(np.cumsum(days) - days, days)
+        calendar = pd.MultiIndex.from_arrays([np.repeat(span.index.to_numpy(), days),
+                                              np.repeat(span['min'].to_numpy(), days) + pd.to_timedelta(offsets, unit='D')],
+                                             names=['boatName', 'date'])
+        missing = calendar[~calendar.isin(pd.MultiIndex.from_frame(self.df[['boatName', 'date']]))]
+
+        if len(missing):
+            dates = missing.get_level_values('date')
+            new_df = pd.DataFrame({
+                'date': dates,
+                'boatName': missing.get_level_values('boatName'),
+                'portCode': 'AS',
+                'ts_in': dates + pd.Timedelta(hours=6),
+                'ts_out': dates + pd.Timedelta(hours=22)
+            })
             self.df = pd.concat([self.df, new_df], ignore_index=True)
             self.df = self.df.sort_values(by=['boatName', 'date']).reset_index(drop=True)
 
 
-# Usage
-folder = r'./data/calendar/historical_cruise_schedules'
-#folder = r'.data//calendar/development_data'
-
-dfs = []
-
-for root, _, files in os.walk(folder):
-    for file in files:
-        if file.lower().endswith('.pdf'):
-            pdf_path = os.path.join(root, file)
-            print(pdf_path)
-            csv_path = pdf_path.replace('pdf', 'csv')
-            year = pdf_path.split('/')[-1][:4]
-
-            parser = CalendarParser(pdf_path, csv_path, year)
-            parser.processPDF()
-            parser.createDailyRows()
-            parser.convertCodesToNames()
-            parser.fillNextPorts()
-            parser.df.to_csv(parser.csv_path, index=False)
-            dfs.append(parser.df)
-
-
-# for root, _, files in os.walk(folder):
-#     for file in files:
-#         if file.lower().endswith('.csv'):
-#             print(f'reading {os.path.join(root, file)}')
-#             file_path = os.path.join(root, file)
-#             try:
-#                 # Read each CSV file into a DataFrame
-#                 df = pd.read_csv(file_path)
-#                 # Append DataFrame to the list
-#                 dfs.append(df)
-#             except Exception as e:
-#                 print(f"Error reading {file_path}: {e}")
-
-# Concatenate all DataFrames in the list into one big DataFrame
-big_df = pd.concat(dfs, ignore_index=True)
-
-#output statistics for easy cleanup
-grouped = big_df.groupby('boatName').size().reset_index(name='count')
-grouped.to_csv('./data/calendar/allyears_allports_claa_groupstats.csv', index=False)
-
-big_df.to_csv('./data/calendar/allyears_allports_claa.csv')
-
-
-
-
-
+    ####### BUILDING #######
+
+    @staticmethod
+    def buildYear(pdf_path, content_hash = None):
+        """parses one season's pdf and writes its table next to it as csv, returns the csv path"""
+        csv_path = os.path.splitext(pdf_path)[0] + '.csv'
+        parser = CalendarParser(pdf_path, csv_path, os.path.basename(pdf_path)[:4])
+        parser.processPDF(content_hash)
+        parser.createDailyRows()
+        parser.convertCodesToNames()
+        parser.fillNextPorts()
+        parser.df.to_csv(parser.csv_path, index=False)
+        return csv_path
+
+    @staticmethod
+    def rebuild(folder = SCHEDULES_FOLDER, workers = None, force = False):
+        """rebuilds the csv of every season whose pdf changed since its csv was written (all of them with force), in a
+           process pool of workers (None for one per core), then concatenates every season into ALLYEARS_PATH.
+           built.json in CACHE_FOLDER records the content hash each csv was built from. Returns the all years table
+        """
+        pdf_paths = sorted(os.path.join(root, file) for root, _, files in os.walk(folder) for file in files if file.lower().endswith('.pdf'))
+        csv_paths = [os.path.splitext(pdf_path)[0] + '.csv' for pdf_path in pdf_paths]
+        hashes = [FileSignature.contentHash(pdf_path) for pdf_path in pdf_paths]
+
+        built_path = os.path.join(CalendarParser.CACHE_FOLDER, 'built.json')
+        built = {}
+        if os.path.exists(built_path):
+            with open(built_path) as f:
+                built = json.load(f)
+        stale = [i for i, (pdf_path, csv_path) in enumerate(zip(pdf_paths, csv_paths))
+                 if force or built.get(pdf_path) != hashes[i] or not os.path.exists(csv_path)]
+        print(f'Rebuilding {len(stale)} of {len(pdf_paths)} seasons: {[pdf_paths[i] for i in stale]}')
+
+        jobs = ([pdf_paths[i] for i in stale], [hashes[i] for i in stale])
+        if len(stale) > 1 and (workers is None or workers > 1):
+            with ProcessPoolExecutor(max_workers = workers) as executor:
+                list(executor.map(CalendarParser.buildYear, *jobs))
+        else:
+            list(map(CalendarParser.buildYear, *jobs))
+        for i in stale:
+            built[pdf_paths[i]] = hashes[i]
+        os.makedirs(CalendarParser.CACHE_FOLDER, exist_ok = True)
+        with open(built_path, 'w') as f:
+            json.dump(built, f, indent = 1)
+
+        # every season is read back from its csv, so unchanged and rebuilt seasons are written out alike
+        dfs = [pd.read_csv(csv_path, dtype=str, keep_default_na=False) for csv_path in csv_paths]
+        big_df = pd.concat(dfs, ignore_index=True)
+
+        #output statistics for easy cleanup
+        grouped = big_df.groupby('boatName').size().reset_index(name='count')
+        grouped.to_csv(CalendarParser.GROUPSTATS_PATH, index=False)
+
+        big_df.to_csv(CalendarParser.ALLYEARS_PATH)
+        return big_df
+
+
+if __name__ == '__main__':
+    arguments = argparse.ArgumentParser(description='Rebuilds the CLAA schedule csvs from the historical cruise schedule pdfs')
+    arguments.add_argument('--folder', default=CalendarParser.SCHEDULES_FOLDER)
+    #arguments.add_argument('--folder', default=r'.data//calendar/development_data')
+    arguments.add_argument('--workers', type=int, default=None, help='seasons parsed in parallel, one per core by default')
+    arguments.add_argument('--force', action='store_true', help='rebuild every season, page tables still come from the cache')
+    args = arguments.parse_args()
+    CalendarParser.rebuild(args.folder, args.workers, args.force)
@@ -0,0 +1,94 @@
+# Point-in-area tests against the reference layers: prepared unions, a bounding box prefilter and cached visit flags
+import numpy as np
+import shapely
+import geopandas as gpd
+
+from ReferenceLayers import ReferenceLayers
+from GridIndex import GridIndex
+
+
+class Containment():
+
+    ####### AREAS #######
+
+    @staticmethod
+    def registeredKey(area, epsg = 4326):
+        """(layer name, epsg) of a registered layer name or of a frame handed out by the registry, in the crs of the
+           points tested against it whatever crs the frame was handed out in. None for any other area
+        """
+        if isinstance(area, str):
+            return (area, epsg or 4326)
+        key = ReferenceLayers.keyOf(area)
+        return None if key is None else (key[0], epsg or 4326)
+
+    @staticmethod
+    def geometry(area, epsg = 4326):
+        """returns area as a prepared geometry in epsg, the crs of the points tested against it. area is a registered
+           layer name or a layer frame; registered layers (including frames handed out by the registry) are unioned and
+           prepared once per process. Other frames are reprojected to epsg first, shapely geometries are taken to be in epsg.
+        """
+        key = Containment.registeredKey(area, epsg)
+        if key is not None:
+            return ReferenceLayers.union(*key)
+        if hasattr(area, 'geometry'):
+            if area.crs is None:
+                raise ValueError('area has no crs, set one (e.g. set_crs(4326)) before testing points against it')
+            geometry = ReferenceLayers.unionOf(area.geometry.to_crs(epsg = epsg or 4326))
+        else:
+            geometry = area
+        shapely.prepare(geometry)
+        return geometry
+
+    @staticmethod
+    def xy(data):
+        """x/y arrays of the points of data. Taken from the point geometry when there is one, else from the lon/lat columns,
+           so plain cruise data never needs its geometry built.
+        """
+        if isinstance(data, gpd.GeoSeries):
+            return data.x.to_numpy(), data.y.to_numpy()
+        if isinstance(data, gpd.GeoDataFrame) and 'geometry' in data.columns:
+            return data.geometry.x.to_numpy(), data.geometry.y.to_numpy()
+        return data['lon'].to_numpy(dtype = float), data['lat'].to_numpy(dtype = float)
+
+    ####### TESTS #######
+
+    @staticmethod
+    def mask(data, area, predicate = 'intersects', epsg = 4326):
+        """boolean array, True for every point of data that intersects area (or lies strictly within it for predicate='within').
+           Registered layers are answered from their GridIndex. For other areas, points outside the bounding box are
+           rejected with array comparisons and only the rest are tested against the polygon.
+        """
+        x, y = Containment.xy(data)
+        key = Containment.registeredKey(area, epsg)
+        if key is not None:
+            return GridIndex.get(*key).mask(x, y, predicate)
+
+        geometry = Containment.geometry(area, epsg)
+        minx, miny, maxx, maxy = geometry.bounds
+        result = np.zeros(len(x), dtype = bool)
+        candidates = np.flatnonzero((x >= minx) & (x <= maxx) & (y >= miny) & (y <= maxy))
+        if len(candidates):
+            test = shapely.contains_xy if predicate == 'within' else shapely.intersects_xy
+            result[candidates] = test(geometry, x[candidates], y[candidates])
+        return result
+
+    @staticmethod
+    def intersectsAny(data, area, epsg = 4326):
+        """True if any point of data intersects area. The extent of data is compared with the area's bounding box before any point is tested"""
+        x, y = Containment.xy(data)
+        if len(x) == 0 or np.isnan(x).all():
+            return False
+        minx, miny, maxx, maxy = Containment.geometry(area, epsg).bounds
+        if np.nanmax(x) < minx or np.nanmin(x) > maxx or np.nanmax(y) < miny or np.nanmin(y) > maxy:
+            return False
+        return bool(Containment.mask(data, area, epsg = epsg).any())
+
+    @staticmethod
+    def visits(owner, area):
+        """visit flag of a cruise or segment for a registered layer name. Computed once and kept in owner.visitFlags,
+           which the owner empties whenever its data changes.
+        """
+        data = owner.data # read first: a cruise folds in buffered groups here, which empties its flags
+        if area not in owner.visitFlags:
+            owner.visitFlags[area] = Containment.intersectsAny(data, area)
+        return owner.visitFlags[area]
@@ -2,6 +2,9 @@ import pandas as pd
 from AIS import AIS
 from Slicer import Slicer
 from Geoprocessor import Geoprocessor
+from AISSchema import AISSchema
+from ReferenceLayers import ReferenceLayer
+from Projector import Projector
 
 
 import os
@@ -43,14 +46,14 @@ class Cruise(AIS):
         'Cordova': {'name': 'Cordova Cruise Ship Dock', 'coordinates': (-145.7575, 60.5428)},
     }
 
-    DOCK_BUFFERS = gpd.read_file(r'./data/buffers/docks_albers_2000m_buffer.shp')
+    DOCK_BUFFERS = ReferenceLayer('dock_buffers')
 
     ##### CONSTRUCTORS AND REPRESENTATION #####
     
     def __init__(self, cruiseID):
         super().__init__()
-        self.data = gpd.GeoDataFrame(columns=['lat', 'lon', 'bs_ts', 'geometry'], geometry = 'geometry') #use gdf as primary data storage, add Geometries and other attributes during data import.
-        self.df_list = []
+        self.df_list = [] # groups buffered during import, concatenated once into data on first read
+        self.data = pd.DataFrame(columns=['lat', 'lon', 'bs_ts']) #plain coordinates during import, point geometry is added on first spatial use (see geodata)
 
         self.cruiseID = cruiseID
 
@@ -62,9 +65,64 @@ class Cruise(AIS):
         self.days = []
         self.time_records = []
 
+        self._localTimes = None # AKDT view of data.bs_ts, built on first use
+
+        self.startTime = None # time extent of all imported groups, kept so matching never needs the full data
+        self.endTime = None
+
     def __str__(self):
         return self.data.to_string()
 
+    @property
+    def data(self):
+        """the cruise's rows, buffered groups are concatenated in on first read. Holds a geometry column once geodata was used"""
+        if self.df_list:
+            self.concatenateDataList()
+        return self._data
+
+    @data.setter
+    def data(self, value):
+        self._data = value
+        self._localTimes = None
+        self._prefixValid = False
+        self.visitFlags = {} # layer name -> bool, see Containment.visits
+
+    @property
+    def geodata(self):
+        """the cruise's rows as a GeoDataFrame, see ensureGeometry"""
+        return self.ensureGeometry()
+
+    def ensureGeometry(self):
+        """builds point geometry once, vectorized, from lat/lon and keeps it in data (which becomes a GeoDataFrame),
+           so columns added through either view stay visible in both. Returns data
+        """
+        data = self.data
+        if not isinstance(data, gpd.GeoDataFrame) or 'geometry' not in data.columns:
+            self._data = self._init_geodata(data)
+        return self._data
+
+    @property
+    def localTimes(self):
+        """AKDT timestamps of the cruise's pings. data keeps UTC, the local view is only built when asked for"""
+        if self._localTimes is None:
+            self._localTimes = Slicer.toLocalTime(self.data['bs_ts'])
+        return self._localTimes
+
+    @property
+    def pathData(self):
+        """data with the cumulative distance and elapsed time columns (see PathCalculations.addPrefixColumns),
+           rebuilt on first use after the data changed. Interval queries on it are a subtraction.
+        """
+        data = self.data
+        if not self._prefixValid:
+            PathCalculations.addPrefixColumns(data)
+            self._prefixValid = True
+        return data
+
+    def projectedXY(self, epsg = Projector.ALBERS):
+        """x/y arrays of the pings in a projected crs (metres). Transformed once and kept as x_<epsg>/y_<epsg> columns of data"""
+        return Projector.projectedXY(self.data, epsg)
+
     ##### MAIN IMPORT FUNCTIONALITIES #####
 
     def _init_geodata(self, group):
@@ -74,15 +132,25 @@ class Cruise(AIS):
         """Adds a full group pd DataFrame object to the Cruise instance 
            on which the method is called
         """
-        #self.df_list.append(self._init_geodata(group))
-        self.data = pd.concat([self.data, self._init_geodata(group)], ignore_index=True) #converts and adds new data to end of existing geodata
-        self.days.append(group['bs_ts'][0].date())
-        self.data['cruise_id'] = self.cruiseID #update cruiseID
+        self.df_list.append(group) # buffered, concatenated once by concatenateDataList
+        self.days.append(Slicer.toLocalTime(group['bs_ts'][0]).date()) # days are AKDT calendar days
+
+        group_start, group_end = group['bs_ts'].min(), group['bs_ts'].max()
+        self.startTime = group_start if self.startTime is None else min(self.startTime, group_start)
+        self.endTime = group_end if self.endTime is None else max(self.endTime, group_end)
 
     def concatenateDataList(self):
         """converts data storage from list to big DataFrame to avoid costly copying
         """
-        self.data = pd.concat([self.data] + self.df_list, ignore_index=True)
+        if not self.df_list:
+            return
+        if 'geometry' in self._data.columns: # back to plain coordinates, geodata rebuilds the points for all rows
+            self._data = pd.DataFrame(self._data.drop(columns='geometry'))
+        self._data = AISSchema.concat([self._data] + self.df_list)
+        self._localTimes = None
+        self._prefixValid = False
+        self.visitFlags = {}
+        self._data['cruise_id'] = self.cruiseID #update cruiseID
         self.df_list = [] # reset DF's since storage is now in self.data after import
 
     def addCruiseToShapfile(self, shapefile):
@@ -96,9 +164,12 @@ class Cruise(AIS):
         """
         Determine if an unassigned group matches a given cruise based on a time threshold.
         """
-        max_timestamp = self.data['bs_ts'].max()
+        max_timestamp = self.endTime
         min_timestamp = group['bs_ts'].min()
 
+        if max_timestamp is None: # nothing imported yet
+            return False
+
         if (min_timestamp - max_timestamp) <= Cruise.TIMELAPSE_THRESHOLD:
         #if unassigned_group.name.mode()[0] == cruise.data.name.mode()[0]:
             return True
@@ -0,0 +1,24 @@
+# Stat and content signatures of data files, the keys the caches and the snapshot manifest compare
+import os
+import hashlib
+
+
+class FileSignature():
+
+    @staticmethod
+    def signature(file_path, withHash = False):
+        """size and mtime of a file, and its content hash with withHash"""
+        stat = os.stat(file_path)
+        signature = {'size': stat.st_size, 'mtime': stat.st_mtime_ns}
+        if withHash:
+            signature['sha1'] = FileSignature.contentHash(file_path)
+        return signature
+
+    @staticmethod
+    def contentHash(file_path):
+        """sha1 of a file's bytes, read in 1 MB chunks"""
+        sha1 = hashlib.sha1()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                sha1.update(chunk)
+        return sha1.hexdigest()
@@ -0,0 +1,70 @@
+# Enter/exit events of time-ordered pings against the geofence layers, found in one vectorized pass per fence
+import numpy as np
+import pandas as pd
+
+from Containment import Containment
+
+
+class GeofenceEvents():
+    FENCES = ['glba_geofence', 'port_glba', 'nps_boundary_glba'] # registered layer names, see ReferenceLayers
+    COLUMNS = ['vessel', 'cruise', 'fence', 'entry_index', 'exit_index', 'entry_ts', 'exit_ts', 'dwell']
+
+    ####### EXTRACTION #######
+
+    @staticmethod
+    def extract(data, fences = FENCES, vessel = None, predicate = 'intersects'):
+        """returns one row per visit of data's pings to each fence, a visit being a run of consecutive pings inside it.
+           data must be time ordered (one vessel's flattened cruises or a single cruise). entry/exit index are the index
+           labels of the first and last ping inside, dwell is exit_ts - entry_ts. Runs never span two cruises.
+        """
+        tables = [GeofenceEvents.fromMask(data, Containment.mask(data, fence, predicate), fence, vessel) for fence in fences]
+        return pd.concat(tables, ignore_index = True) if tables else pd.DataFrame(columns = GeofenceEvents.COLUMNS)
+
+    @staticmethod
+    def fromMask(data, inside, fence, vessel = None):
+        """event table of one fence from a boolean array with one entry per row of data"""
+        inside = np.asarray(inside, dtype = bool)
+        entries, exits = GeofenceEvents.runs(inside, data['cruise_id'].to_numpy() if 'cruise_id' in data.columns else None)
+
+        entry_ts = data['bs_ts'].iloc[entries].reset_index(drop = True)
+        exit_ts = data['bs_ts'].iloc[exits].reset_index(drop = True)
+        if vessel is None and 'name' in data.columns:
+            vessel = data['name'].iloc[entries].astype(object).to_numpy()
+        return pd.DataFrame({
+            'vessel': vessel if len(entries) else [],
+            'cruise': data['cruise_id'].iloc[entries].to_numpy() if 'cruise_id' in data.columns else None,
+            'fence': fence,
+            'entry_index': data.index[entries],
+            'exit_index': data.index[exits],
+            'entry_ts': entry_ts,
+            'exit_ts': exit_ts,
+            'dwell': exit_ts - entry_ts,
+        }, columns = GeofenceEvents.COLUMNS)
+
+    @staticmethod
+    def runs(inside, groups = None):
+        """(entries, exits) positions of the first and last element of every run of True in inside.
+           With groups (e.g. cruise ids) a run is also cut where the group changes.
+        """
+        n = len(inside)
+        if n == 0:
+            return np.zeros(0, dtype = np.intp), np.zeros(0, dtype = np.intp)
+        starts = np.ones(n, dtype = bool)
+        starts[1:] = ~inside[:-1]
+        ends = np.ones(n, dtype = bool)
+        ends[:-1] = ~inside[1:]
+        if groups is not None:
+            changed = groups[1:] != groups[:-1]
+            starts[1:] |= changed
+            ends[:-1] |= changed
+        return np.flatnonzero(inside & starts), np.flatnonzero(inside & ends)
+
+    ####### QUERIES #######
+
+    @staticmethod
+    def nextIndexAfterLastExit(data, events):
+        """index label of the first ping after the last exit in events, None if there is no event or the last exit is the last ping"""
+        if events.empty:
+            return None
+        position = data.index.get_loc(events['exit_index'].iloc[-1]) + 1
+        return data.index[position] if position < len(data) else None
@@ -5,10 +5,12 @@ from PortManager import PortManager
 import os
 
 from PathCalculations import PathCalculations
+from ReferenceLayers import ReferenceLayer
+from Containment import Containment
+from GeofenceEvents import GeofenceEvents
 
 class Geoprocessor():
-    GLBA_BOUNDARY = gpd.read_file(r'./data/shapes/GlacierBayGeofence.shp')
-    GLBA_BOUNDARY = GLBA_BOUNDARY.set_crs(epsg=4326)
+    GLBA_BOUNDARY = ReferenceLayer('glba_geofence')
     PROJECT_EPSG = 4326
 
     def __init__(self, data):
@@ -23,13 +25,8 @@ class Geoprocessor():
         """
         #print('converting data to geodata')
         if 'lat' in data.columns and 'lon' in data.columns: #brief check for xy contents, return gdf with None geometry if not
-            geometry = [Point(xy) for xy in zip(data['lon'], data['lat'])]
-            #points_gdf = gpd.GeoDataFrame(data, geometry=gpd.points_from_xy(data['longitude'], data['latitude'])) 
-            # ^^ another way to do it
-            gdf = gpd.GeoDataFrame(data, geometry=geometry)
-            gdf.set_crs(epsg=4326, inplace=True)
-            gdf = gdf.set_geometry(geometry)
-            return gdf
+            geometry = gpd.points_from_xy(data['lon'], data['lat'], crs='EPSG:4326') # built as one array, no per-row Point objects in Python
+            return gpd.GeoDataFrame(data, geometry=geometry, crs='EPSG:4326')
         else:
             print('error') 
             return gpd.GeoDataFrame(data, geometry=None)
@@ -37,25 +34,24 @@ class Geoprocessor():
     ######## CLIPPING #######
     def clip(self, boundary, within = True):
         """clips geodata to within the boundary unless specified"""
-        if within:
-            return self.gdf[self.gdf.geometry.within(boundary.geometry.unary_union)]
-        else:
-            return self.gdf[~self.gdf.geometry.within(boundary.geometry.unary_union)]
+        return Geoprocessor.clip2(self.gdf, boundary, within)
         
     @staticmethod
     def clip2(gdf, boundary, within = True):
         """clips geodata to within the boundary unless specified"""
+        epsg = gdf.crs.to_epsg() if getattr(gdf, 'crs', None) is not None else 4326 # the boundary is tested in the points' crs
+        inside = Containment.mask(gdf, boundary, predicate = 'within', epsg = epsg)
         if within:
-            return gdf[gdf.geometry.within(boundary.geometry.unary_union)]
+            return gdf[inside]
         else:
-            return gdf[~gdf.geometry.within(boundary.geometry.unary_union)]
+            return gdf[~inside]
 
     ######## EXPORTING ########
 
     @staticmethod 
     def toPointShapefile(cruise, filepath):
         # Create geometries from lon and lat
-        gdf = cruise.data
+        gdf = cruise.geodata.assign(bs_ts = cruise.localTimes) # exported in AKDT, the cruise keeps UTC
         gdf.set_crs(epsg=4326, inplace=True)
         
         # Add additional information
@@ -73,7 +69,7 @@ class Geoprocessor():
     def appendToPointShapefile(cruise, filepath):
         """Adds the self.gdf entries to the shapefile at filepath. If the file doesn't exist, then creates one."""
         full_path = os.path.join(os.getcwd(), filepath)
-        gdf = cruise.data
+        gdf = cruise.geodata.assign(bs_ts = cruise.localTimes) # exported in AKDT, the cruise keeps UTC
         
         # Add additional information
         gdf['cruiseID'] = cruise.cruiseID
@@ -93,14 +89,14 @@ class Geoprocessor():
     @staticmethod          
     def toLineShapefile(cruise, filepath, start_index, end_index):
         if start_index and end_index:
-            line = LineString(cruise.data.loc[start_index:end_index].geometry.values)
-            distance = PathCalculations.distanceAlongPath(cruise.data.geometry, start_index, end_index)[1]
-            time = PathCalculations.timelapseAlongPath(cruise.data.bs_ts ,start_index, end_index)
+            line = LineString(cruise.geodata.loc[start_index:end_index].geometry.values)
+            distance = PathCalculations.distanceBetween(cruise.pathData, start_index, end_index)
+            time = PathCalculations.timelapseBetween(cruise.pathData, start_index, end_index)
 
         else: 
-            line = LineString(cruise.data.geometry.values)
-            distance = PathCalculations.distanceAlongPath(cruise.data.geometry, cruise.data.index[0], cruise.data.index[-1])[1]
-            time = PathCalculations.timelapseAlongPath(cruise.data.bs_ts, cruise.data.index[0], cruise.data.index[-1])
+            line = LineString(cruise.geodata.geometry.values)
+            distance = PathCalculations.distanceBetween(cruise.pathData, 0, -1)
+            time = PathCalculations.timelapseBetween(cruise.pathData, 0, -1)
 
         new_row = {
             'cruiseID': cruise.cruiseID,
@@ -114,7 +110,7 @@ class Geoprocessor():
         }
 
         # Create a new GeoDataFrame with the new row
-        line_gdf = gpd.GeoDataFrame([new_row], geometry=[line], crs=cruise.data.crs)
+        line_gdf = gpd.GeoDataFrame([new_row], geometry=[line], crs=cruise.geodata.crs)
         line_gdf.set_crs(epsg=4326, inplace=True)
         line_gdf.to_file(os.path.join(os.getcwd(), filepath), driver='ESRI Shapefile')
 
@@ -131,23 +127,16 @@ class Geoprocessor():
         """Populates new inGLBA column as True or false depending on intersection with the GLBA boundary polygon. 
            Will be used to determine exit time from GLBA
         """
-        search_area = PortManager.GLBA_BOUNDARY
-        search_area = search_area.to_crs(4326)
         self.gdf['inGLBA'] = None #initialize column and set default to None type
-        
-        intersecting_points = self.gdf[self.gdf.geometry.intersects(search_area.geometry.unary_union)]
-        intersecting_indices = intersecting_points.index
-        if not intersecting_indices.empty:
-            self.gdf.loc[intersecting_indices, 'inGLBA'] = True
 
-            last_true_index = intersecting_indices[-1]
-            next_index = self.gdf.index[self.gdf.index > last_true_index][0] if last_true_index < self.gdf.index[-1] else None
-
-            #print(f"Last True Index: {last_true_index}, Next Index: {next_index}")
-        else:
+        inside = Containment.mask(self.gdf, 'port_glba')
+        events = GeofenceEvents.fromMask(self.gdf, inside, 'port_glba')
+        if events.empty:
             print("No intersecting points found.")
+            return None
 
-        return next_index
+        self.gdf.loc[inside, 'inGLBA'] = True
+        return GeofenceEvents.nextIndexAfterLastExit(self.gdf, events)
     
 
     
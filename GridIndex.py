@@ -0,0 +1,101 @@
+# Precomputed grid over a reference layer: cells fully inside or outside answer point lookups with an array index,
+# only points in cells crossed by the layer's boundary are tested against the polygon
+import os
+import numpy as np
+import shapely
+
+from ReferenceLayers import ReferenceLayers
+
+
+class GridIndex():
+    CACHE_FOLDER = r'./data/cache/grids'
+    RESOLUTION = 0.01 # cell size in layer units (degrees for 4326), grown when the layer's extent would need more than MAX_CELLS
+    MAX_CELLS = 1 << 20
+
+    OUTSIDE, INSIDE, BOUNDARY = 0, 1, 2
+
+    _grids = {} # (name, epsg, resolution) -> GridIndex
+
+    def __init__(self, name, epsg = 4326, resolution = RESOLUTION):
+        self.name = name
+        self.epsg = epsg
+        self.geometry = ReferenceLayers.union(name, epsg)
+        signature = ReferenceLayers.signature(name)
+
+        cache_path = os.path.join(GridIndex.CACHE_FOLDER, f"{name}_{epsg or 'source'}_{resolution}.npz")
+        if os.path.exists(cache_path):
+            cached = np.load(cache_path)
+            if str(cached['signature']) == repr(signature): # the layer's file stats, see ReferenceLayers.signature
+                self.origin, self.resolution, self.cells = tuple(cached['origin']), float(cached['resolution']), cached['cells']
+                return
+
+        self.origin, self.resolution, self.cells = GridIndex.classify(self.geometry, resolution)
+        os.makedirs(GridIndex.CACHE_FOLDER, exist_ok = True)
+        np.savez(cache_path, signature = np.array(repr(signature)), origin = np.array(self.origin), resolution = self.resolution, cells = self.cells)
+
+    @staticmethod
+    def get(name, epsg = 4326, resolution = RESOLUTION):
+        """returns the grid of a registered layer, built (or read from disk) once per process"""
+        key = (name, epsg, resolution)
+        if key not in GridIndex._grids:
+            GridIndex._grids[key] = GridIndex(name, epsg, resolution)
+        return GridIndex._grids[key]
+
+    @staticmethod
+    def clear():
+        GridIndex._grids.clear()
+
+    ####### BUILDING #######
+
+    @staticmethod
+    def classify(geometry, resolution):
+        """returns (origin, resolution, cells) where cells[row, col] is INSIDE, OUTSIDE or BOUNDARY for the cell
+           whose lower left corner is origin + (col, row) * resolution. Cells are classified on slightly grown boxes
+           so points on a cell edge never get a wrong answer from rounding in the lookup.
+        """
+        minx, miny, maxx, maxy = geometry.bounds
+        resolution = max(resolution, np.sqrt((maxx - minx) * (maxy - miny) / GridIndex.MAX_CELLS))
+        nx = int(np.floor((maxx - minx) / resolution)) + 1 # a point exactly on the max edge still falls on the grid
+        ny = int(np.floor((maxy - miny) / resolution)) + 1
+
+        cols, rows = np.meshgrid(np.arange(nx), np.arange(ny))
+        x0 = minx + cols.ravel() * resolution
+        y0 = miny + rows.ravel() * resolution
+        pad = resolution * 1e-6
+        boxes = shapely.box(x0 - pad, y0 - pad, x0 + resolution + pad, y0 + resolution + pad)
+
+        cells = np.full(nx * ny, GridIndex.OUTSIDE, dtype = np.uint8)
+        touching = np.flatnonzero(shapely.intersects(geometry, boxes))
+        cells[touching] = GridIndex.BOUNDARY
+        inside = touching[shapely.contains_properly(geometry, boxes[touching])]
+        cells[inside] = GridIndex.INSIDE
+        return (minx, miny), resolution, cells.reshape(ny, nx)
+
+    ####### LOOKUP #######
+
+    def mask(self, x, y, predicate = 'intersects'):
+        """boolean array, True for every point (x, y) that intersects the layer (or lies strictly within it for predicate='within').
+           Points outside the grid or in OUTSIDE/INSIDE cells are answered from the grid, the rest with an exact test.
+        """
+        x = np.asarray(x, dtype = float)
+        y = np.asarray(y, dtype = float)
+        ny, nx = self.cells.shape
+        with np.errstate(invalid = 'ignore'):
+            col = np.floor((x - self.origin[0]) / self.resolution)
+            row = np.floor((y - self.origin[1]) / self.resolution)
+        onGrid = (col >= 0) & (col < nx) & (row >= 0) & (row < ny) # False for NaN coordinates
+
+        state = np.full(len(x), GridIndex.OUTSIDE, dtype = np.uint8)
+        state[onGrid] = self.cells[row[onGrid].astype(np.intp), col[onGrid].astype(np.intp)]
+
+        result = state == GridIndex.INSIDE
+        boundary = np.flatnonzero(state == GridIndex.BOUNDARY)
+        if len(boundary):
+            test = shapely.contains_xy if predicate == 'within' else shapely.intersects_xy
+            result[boundary] = test(self.geometry, x[boundary], y[boundary])
+        return result
+
+    def stats(self):
+        """share of cells in each state, for choosing a resolution"""
+        counts = np.bincount(self.cells.ravel(), minlength = 3) / self.cells.size
+        return {'outside': float(counts[GridIndex.OUTSIDE]), 'inside': float(counts[GridIndex.INSIDE]), 'boundary': float(counts[GridIndex.BOUNDARY])}
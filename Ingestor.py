@@ -0,0 +1,76 @@
+# Reads daily AIS files and groups their rows by boat ahead of BoatsData.parseGroups
+import os
+import pandas as pd
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+
+from Slicer import Slicer
+from AISSchema import AISSchema
+
+
+class Ingestor():
+    def __init__(self, dataFolder, workers = 1, cache = None, columns = None):
+        self.dataFolder = dataFolder
+        self.workers = workers
+        self.cache = cache # AISCache instance, None reads the csv files directly
+        self.columns = columns # subset of columns to load, must include 'name' and 'bs_ts' (and 'lat'/'lon' for geometry)
+
+    ####### LISTING FILES #######
+
+    @staticmethod
+    def listFiles(dataFolder):
+        """returns the csv file paths under dataFolder in the order they are ingested (walk order, sorted within each folder)
+        """
+        file_paths = []
+        for dirs, _, files in os.walk(dataFolder):
+            for f in sorted(files):
+                if f.endswith('csv'):
+                    file_paths.append(os.path.join(dirs, f))
+        return file_paths
+
+    ####### READING AND GROUPING #######
+
+    @staticmethod
+    def groupRows(rows):
+        """Splits a file's rows into (boatName, group) pairs in groupby order.
+           Rows are cast to the AISSchema types first (timestamps are parsed to UTC once per file here).
+           Groups are returned chronologically ordered, named groups are also reindexed from 0.
+        """
+        rows = AISSchema.enforce(rows)
+        groups = []
+        for boatName, group in rows.groupby('name', dropna = False, observed = True):
+            if pd.isna(boatName):
+                group = group.sort_values(by='bs_ts', ascending=True)
+            else:
+                group = Slicer.orderGroupByTime(group)
+            groups.append((boatName, group))
+        return groups
+
+    @staticmethod
+    def readRows(file_path, cache = None, columns = None):
+        """reads one daily file, from the columnar cache when one is given"""
+        if cache is not None:
+            return cache.read(file_path, columns = columns)
+        return AISSchema.readCsv(file_path, columns = columns)
+
+    @staticmethod
+    def readAndGroup(file_path, cache = None, columns = None):
+        """reads one daily file and groups it by boat. Runs inside worker processes, so it only returns picklable results
+        """
+        rows = Ingestor.readRows(file_path, cache, columns)
+        return file_path, Ingestor.groupRows(rows), len(rows)
+
+    def readFiles(self, file_paths = None):
+        """yields (file_path, groups, rowCount) for every file (or only file_paths) in ingestion order.
+           With more than one worker the files are read and grouped in a process pool,
+           results are still yielded in file order so cruises are built exactly as in the serial path.
+        """
+        if file_paths is None:
+            file_paths = Ingestor.listFiles(self.dataFolder)
+        readAndGroup = partial(Ingestor.readAndGroup, cache = self.cache, columns = self.columns)
+        if self.workers is None or self.workers > 1:
+            with ProcessPoolExecutor(max_workers = self.workers) as executor:
+                yield from executor.map(readAndGroup, file_paths)
+        else:
+            for file_path in file_paths:
+                yield readAndGroup(file_path)
@@ -0,0 +1,77 @@
+# Overlap join of time intervals per key (e.g. AIS visits against CLAA port calls of the same vessel), on sorted arrays
+import numpy as np
+import pandas as pd
+
+
+class IntervalJoin():
+    """Index over the [start, end] intervals of a frame, grouped by key. Per key the intervals are kept sorted by start
+       with the running maximum of their ends, so the candidates of a query interval are one contiguous slice found by
+       two binary searches: intervals starting before the query ends, minus the leading ones that all end before it starts.
+    """
+    NAT = np.iinfo(np.int64).min # NaT as int64
+
+    def __init__(self, data, by, start, end, tolerance = pd.Timedelta(0)):
+        """indexes data's rows whose start and end (naive datetime columns) are set. Every interval is widened by tolerance on both sides"""
+        self.data = data
+        self.by = by
+        self.tolerance = pd.Timedelta(tolerance).value
+        starts = IntervalJoin.nanoseconds(data[start])
+        ends = IntervalJoin.nanoseconds(data[end])
+        valid = (starts != IntervalJoin.NAT) & (ends != IntervalJoin.NAT)
+
+        self._starts = starts # int64 start of every row of data, before tolerance
+        valid_positions = np.flatnonzero(valid)
+        self._groups = {} # key -> (positions sorted by start, starts, ends, running max of ends)
+        for key, positions in data[valid].groupby(by, sort = False, observed = True).indices.items():
+            positions = valid_positions[positions]
+            positions = positions[np.argsort(starts[positions], kind = 'stable')]
+            group_ends = ends[positions] + self.tolerance
+            self._groups[key] = (positions, starts[positions] - self.tolerance, group_ends, np.maximum.accumulate(group_ends))
+
+    @staticmethod
+    def nanoseconds(timestamps):
+        """int64 nanoseconds of a naive datetime column, NaT as NAT"""
+        return pd.to_datetime(timestamps).to_numpy(dtype = 'datetime64[ns]').view(np.int64)
+
+    ####### QUERIES #######
+
+    def pairs(self, key, starts, ends):
+        """(query positions, data positions) of every indexed interval of key overlapping one of the query intervals,
+           ordered by query then by start. starts/ends are int64 nanoseconds
+        """
+        group = self._groups.get(key)
+        if group is None:
+            return np.zeros(0, dtype = np.intp), np.zeros(0, dtype = np.intp)
+        positions, group_starts, group_ends, reach = group
+        lo = np.searchsorted(reach, starts, side = 'left') # the intervals before lo all end before the query starts
+        hi = np.searchsorted(group_starts, ends, side = 'right') # the intervals from hi on start after the query ends
+        counts = np.maximum(hi - lo, 0)
+        queries = np.repeat(np.arange(len(starts)), counts)
+        candidates = np.repeat(lo, counts) + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        overlapping = group_ends[candidates] >= starts[queries]
+        return queries[overlapping], positions[candidates[overlapping]]
+
+    def join(self, left, start, end, suffixes = ('_x', '_y')):
+        """inner join of left's rows with the indexed rows of the same key whose intervals overlap, in left's row order
+           then by start of the indexed interval. Columns present on both sides get suffixes, like DataFrame.merge
+        """
+        starts = IntervalJoin.nanoseconds(left[start])
+        ends = IntervalJoin.nanoseconds(left[end])
+        valid = (starts != IntervalJoin.NAT) & (ends != IntervalJoin.NAT)
+
+        valid_positions = np.flatnonzero(valid)
+        left_positions, right_positions = [], []
+        for key, positions in left[valid].groupby(self.by, sort = False, observed = True).indices.items():
+            positions = valid_positions[positions]
+            queries, matches = self.pairs(key, starts[positions], ends[positions])
+            left_positions.append(positions[queries])
+            right_positions.append(matches)
+        left_positions = np.concatenate(left_positions) if left_positions else np.zeros(0, dtype = np.intp)
+        right_positions = np.concatenate(right_positions) if right_positions else np.zeros(0, dtype = np.intp)
+        starts_of_matches = self._starts[right_positions]
+        order = np.lexsort((right_positions, starts_of_matches, left_positions)) # row position breaks ties of equal starts
+
+        common = left.columns.intersection(self.data.columns).drop(self.by)
+        left_rows = left.iloc[left_positions[order]].rename(columns = {c: c + suffixes[0] for c in common})
+        right_rows = self.data.iloc[right_positions[order]].drop(columns = self.by).rename(columns = {c: c + suffixes[1] for c in common})
+        return pd.concat([left_rows.reset_index(drop = True), right_rows.reset_index(drop = True)], axis = 1)
@@ -1,5 +1,7 @@
 
 from BoatsData import BoatsData
+from ReferenceLayers import ReferenceLayers
+from Projector import Projector
 
 import geopandas as gpd
 from shapely.geometry import Point
@@ -22,38 +24,32 @@ class Mapper:
         self.data = data
 
     def writeRasters(self, group_field, plot_field):
-        gdf = self.data.to_crs(6394)
-
-        ##### FILTER #####
-        def update_grids(geom, value):
-            x, y = geom.xy
-            row = min(max(int((y[0] - ymin) / cell_size), 0), height - 1)
-            col = min(max(int((x[0] - xmin) / cell_size), 0), width - 1)
-        
-            sum_grid[row, col] += value
-            count_grid[row, col] += 1
-
-        #####################
+        epsg = Projector.ALASKA
+        x_all, y_all = Projector.projectedXY(self.data, epsg) # projected once, kept as columns of self.data
+        values_all = self.data[plot_field].to_numpy(dtype=np.float64)
 
         cell_size = 500  # meters
 
-        grouped = gdf.groupby(group_field)
+        grouped = self.data.groupby(group_field)
 
         rasters = {}
 
-        for key, group in grouped:
-            df = group[group[group_field] == key]
-
-            #print(df.sog.mean())
+        for key, positions in grouped.indices.items():
+            x, y = x_all[positions], y_all[positions]
+            values = values_all[positions]
 
-            xmin, ymin, xmax, ymax = df.total_bounds
+            xmin, ymin, xmax, ymax = x.min(), y.min(), x.max(), y.max()
             width = int((xmax - xmin) / cell_size)
             height = int((ymax - ymin) / cell_size)
 
-            sum_grid = np.zeros((height, width), dtype=np.float64)
-            count_grid = np.zeros((height, width), dtype=np.int64)
+            ##### FILTER #####
+            rows = np.clip(((y - ymin) / cell_size).astype(np.int64), 0, height - 1)
+            cols = np.clip(((x - xmin) / cell_size).astype(np.int64), 0, width - 1)
+            cells = rows * width + cols
+            sum_grid = np.bincount(cells, weights=values, minlength=height * width).reshape(height, width)
+            count_grid = np.bincount(cells, minlength=height * width).reshape(height, width)
+            #####################
 
-            df.apply(lambda row: update_grids(row.geometry, row[plot_field]), axis=1)
             average_grid = np.divide(sum_grid, count_grid, out=np.zeros_like(sum_grid), where=count_grid != 0)
             transform = from_origin(xmin, ymin, cell_size, -cell_size)
             key_name = key.replace(' ','_')
@@ -68,7 +64,7 @@ class Mapper:
                     width=width,
                     count=1,
                     dtype=average_grid.dtype,
-                    crs=gdf.crs,
+                    crs=f'EPSG:{epsg}',
                     transform=transform
                 ) as dst:
                 dst.write(average_grid, 1)
@@ -81,7 +77,6 @@ class Mapper:
     
     @staticmethod
     def plotRaster(key, rasters_dict):
-        vector_data = BoatsData.ALASKA_COASTLINE.to_crs(6394)
 
         raster_file = rasters_dict[key][2]
         extent = rasters_dict[key][4]
@@ -98,7 +93,7 @@ class Mapper:
             # Display raster data
             show(img, cmap='inferno', ax=ax, transform=transform, extent=extent)
 
-            vector_data = vector_data.to_crs(crs)
+            vector_data = ReferenceLayers.get('alaska_coastline', crs.to_epsg() or Projector.ALASKA) # reprojected once and cached
             vector_data.boundary.plot(ax=ax, edgecolor='white', linewidth=1)  # Overlay vector boundaries
 
             ax.set_xlim([extent[0], extent[1]])
@@ -0,0 +1,120 @@
+import geopandas as gpd
+from geopy.distance import distance
+from shapely.geometry import Point, LineString
+from geopy.distance import geodesic
+
+import pandas as pd
+import numpy as np
+from pyproj import Geod
+import os
+
+class PathCalculations:
+    # Leg distances are computed for whole tracks at once. 'ellipsoidal' solves the WGS84 geodesic with pyproj.Geod
+    # (Karney's algorithm, the one geopy.geodesic uses): legs agree with geopy to within 1e-6 m.
+    # 'haversine' uses a sphere of the mean earth radius: within 0.5% of geopy per leg, about 3x faster again.
+    # scripts/benchmark_distance.py measures both against the geopy loop.
+    GEOD = Geod(ellps='WGS84')
+    EARTH_RADIUS_M = 6371008.8
+    METERS_PER_NM = 1852
+    DISTANCE_MODE = 'ellipsoidal'
+
+    ##### DISTANCE ENGINE #####
+
+    @staticmethod
+    def legDistances(lon, lat, mode = DISTANCE_MODE):
+        """returns the distance in meters of every leg between consecutive points of the lon/lat arrays (length n-1)"""
+        lon = np.asarray(lon, dtype=np.float64)
+        lat = np.asarray(lat, dtype=np.float64)
+        if len(lon) < 2:
+            return np.zeros(0, dtype=np.float64)
+        if mode == 'haversine':
+            return PathCalculations.haversine(lon[:-1], lat[:-1], lon[1:], lat[1:])
+        if mode == 'ellipsoidal':
+            return PathCalculations.GEOD.inv(lon[:-1], lat[:-1], lon[1:], lat[1:])[2]
+        raise ValueError(f"unknown distance mode '{mode}', expected 'ellipsoidal' or 'haversine'")
+
+    @staticmethod
+    def haversine(lon1, lat1, lon2, lat2):
+        """great circle distance in meters between arrays of points"""
+        lon1, lat1, lon2, lat2 = map(np.radians, (lon1, lat1, lon2, lat2))
+        a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+        return 2 * PathCalculations.EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+    @staticmethod
+    def trackDistance(geometry, start_index, end_index, mode = DISTANCE_MODE):
+        """returns (leg distances in meters, total km, total nm) of the path through the points at positions start_index..end_index, inclusive.
+           Positions follow iloc: negative positions count from the end and positions past the end raise IndexError.
+        """
+        points = geometry.iloc[np.arange(start_index, end_index + 1)]
+        legs = PathCalculations.legDistances(points.x.to_numpy(), points.y.to_numpy(), mode)
+        total = legs.sum()
+        return legs, total / 1000, total / PathCalculations.METERS_PER_NM
+
+    @staticmethod
+    def distanceAlongPath(geometry, start_index, end_index, mode = DISTANCE_MODE):
+        """returns the distance along the path that connects points in self.gdf between start and end indices, inclusive
+           returns the array of individual distances in meters and then the total distance in kilometers
+        """
+        legs, km, _ = PathCalculations.trackDistance(geometry, start_index, end_index, mode)
+        return legs, round(float(km), 2) #distance in km
+
+    @staticmethod
+    def distanceAlongPath_nm(geometry, start_index, end_index, mode = DISTANCE_MODE):
+        """returns the distance along the path that connects points in self.gdf between start and end indices, inclusive
+           returns the array of individual distances in nautical miles and then the total distance in nautical miles
+        """
+        legs, _, nm = PathCalculations.trackDistance(geometry, start_index, end_index, mode)
+        return legs / PathCalculations.METERS_PER_NM, round(float(nm), 2) #distance in nm (nautical miles)
+
+    @staticmethod
+    def timelapseAlongPath(timestamps, start_index, end_index):
+        time1 = timestamps.iloc[start_index]
+        time2 = timestamps.iloc[end_index]
+        return round((time2-time1).total_seconds()/3600, 2) # time in hours, whole days included
+    
+    @staticmethod
+    def calculate_sinuosity(data, start_index, end_index):
+        """ratio of the distance travelled between two positions to the straight (geodesic) distance between them"""
+        if PathCalculations.CUMULATIVE_DISTANCE in data.columns:
+            actual_distance = PathCalculations.distanceBetween(data, start_index, end_index, unit = 'nm')
+        else:
+            actual_distance = PathCalculations.distanceAlongPath_nm(data.geometry, start_index, end_index)[1]
+        points = data.geometry.iloc[[start_index, end_index]]
+        straight_line_distance = PathCalculations.legDistances(points.x.to_numpy(), points.y.to_numpy())[0] / PathCalculations.METERS_PER_NM
+        return actual_distance / straight_line_distance if straight_line_distance > 0 else 1.0
+
+    ##### PREFIX COLUMNS #####
+
+    CUMULATIVE_DISTANCE = 'cum_dist_m' # meters travelled since the first ping
+    ELAPSED_TIME = 'elapsed_s' # seconds since the first ping
+
+    @staticmethod
+    def addPrefixColumns(data, mode = DISTANCE_MODE):
+        """adds the cumulative distance and elapsed time columns to a time-ordered frame of pings and returns it.
+           Distance or time between any two positions is then a subtraction, see distanceBetween and timelapseBetween.
+           Legs to or from a ping without coordinates count as 0 m instead of making every later distance NaN.
+        """
+        if 'lon' in data.columns and 'lat' in data.columns:
+            lon, lat = data['lon'].to_numpy(dtype=np.float64), data['lat'].to_numpy(dtype=np.float64)
+        else:
+            lon, lat = data.geometry.x.to_numpy(), data.geometry.y.to_numpy()
+        cumulative = np.zeros(len(data), dtype=np.float64)
+        np.cumsum(np.nan_to_num(PathCalculations.legDistances(lon, lat, mode)), out=cumulative[1:])
+        data[PathCalculations.CUMULATIVE_DISTANCE] = cumulative
+
+        timestamps = data['bs_ts']
+        data[PathCalculations.ELAPSED_TIME] = (timestamps - timestamps.iloc[0]).dt.total_seconds().to_numpy() if len(data) else np.zeros(0)
+        return data
+
+    @staticmethod
+    def distanceBetween(data, start_index, end_index, unit = 'km'):
+        """distance travelled between two positions (iloc semantics) of a frame with prefix columns, in km or nm, rounded like distanceAlongPath"""
+        cumulative = data[PathCalculations.CUMULATIVE_DISTANCE].to_numpy()
+        meters = cumulative[end_index] - cumulative[start_index]
+        return round(float(meters / (1000 if unit == 'km' else PathCalculations.METERS_PER_NM)), 2)
+
+    @staticmethod
+    def timelapseBetween(data, start_index, end_index):
+        """hours between two positions (iloc semantics) of a frame with prefix columns"""
+        elapsed = data[PathCalculations.ELAPSED_TIME].to_numpy()
+        return round(float(elapsed[end_index] - elapsed[start_index]) / 3600, 2)
@@ -0,0 +1,75 @@
+# One contiguous frame holding every ping of the season, with the offsets of each vessel and cruise in it
+import pandas as pd
+
+from AISSchema import AISSchema
+
+
+class PointStore():
+    """Pings of all vessels, vessel by vessel in boatsDataDictionary order, each vessel's cruises in creation order.
+       Cruise.data, BoatData.flattenedCruises and BoatsData.flatten are served as zero-copy row slices of it.
+    """
+
+    def __init__(self, data, vessels, cruises, states):
+        self.data = data # the season, on a RangeIndex
+        self.vessels = vessels # boatName -> start, stop
+        self.cruises = cruises # cruise_id -> boatName, start, stop
+        self._states = states # cruise_id -> (the frame the Cruise held after build, its columns), see isCurrent
+
+    ####### BUILDING #######
+
+    @staticmethod
+    def build(boatsData):
+        """concatenates every cruise once and hands each Cruise a view of its rows in place of its own frame.
+           Cruises whose columns differ from the season's (e.g. columns added by an earlier analysis) keep their frame.
+        """
+        frames, vessel_rows, cruise_rows = [], [], []
+        position = 0
+        for boatName, boatData in boatsData.boatsDataDictionary.items():
+            vessel_start = position
+            for cruise_id, cruise in boatData.cruisesDataDictionary.items():
+                data = cruise.data
+                if 'geometry' in data.columns: # plain coordinates, geometry is rebuilt by whoever needs it
+                    data = pd.DataFrame(data.drop(columns='geometry'))
+                frames.append(data)
+                cruise_rows.append((cruise_id, boatName, position, position + len(data)))
+                position += len(data)
+            vessel_rows.append((boatName, vessel_start, position))
+
+        data = AISSchema.concat(frames) if frames else pd.DataFrame()
+        vessels = pd.DataFrame(vessel_rows, columns=['boatName', 'start', 'stop']).set_index('boatName')
+        cruises = pd.DataFrame(cruise_rows, columns=['cruise_id', 'boatName', 'start', 'stop']).set_index('cruise_id')
+        store = PointStore(data, vessels, cruises, {})
+
+        for cruise_id, boatName, start, stop in cruise_rows:
+            cruise = boatsData.boatsDataDictionary[boatName].cruisesDataDictionary[cruise_id]
+            if list(cruise.data.columns) == list(data.columns):
+                cruise.data = store.view(start, stop)
+            store._states[cruise_id] = (cruise._data, list(cruise._data.columns))
+        return store
+
+    ####### VIEWS #######
+
+    def view(self, start, stop):
+        """rows start:stop as a new frame on a RangeIndex that shares the store's memory. Columns added to the view stay in the view"""
+        view = pd.DataFrame(self.data.iloc[start:stop], copy=False)
+        view.index = pd.RangeIndex(stop - start)
+        return view
+
+    def vessel(self, boatName):
+        start, stop = self.vessels.loc[boatName, ['start', 'stop']]
+        return self.view(start, stop)
+
+    def season(self):
+        return self.view(0, len(self.data))
+
+    def isCurrent(self, boatData):
+        """True while no cruise of boatData changed since the store was built: same cruises, no buffered groups,
+           each holding the frame it was given with the same columns
+        """
+        if boatData.boatName not in self.vessels.index:
+            return False
+        for cruise_id, cruise in boatData.cruisesDataDictionary.items():
+            state = self._states.get(cruise_id)
+            if state is None or cruise.df_list or cruise._data is not state[0] or list(cruise._data.columns) != state[1]:
+                return False
+        return len(boatData.cruisesDataDictionary) == (self.cruises['boatName'] == boatData.boatName).sum()
@@ -34,10 +34,10 @@ class PortCodeParser:
                     self.port_codes_dict[codes[0]] = ' '.join(codes[1:])
 
 # Usage
-pdf_path = './data/calendar/claa_port_codes.pdf'
-csv_path = './data/calendar/claa_port_codes.csv'
-
-parser = PortCodeParser(pdf_path, csv_path)
-parser.processPDF()
-print(parser.port_codes_dict)
+if __name__ == '__main__':
+    pdf_path = './data/calendar/claa_port_codes.pdf'
+    csv_path = './data/calendar/claa_port_codes.csv'
 
+    parser = PortCodeParser(pdf_path, csv_path)
+    parser.processPDF()
+    print(parser.port_codes_dict)
@@ -2,12 +2,13 @@ import pandas as pd
 import geopandas as gpd
 import numpy as np
 
+from ReferenceLayers import ReferenceLayer, ReferenceLayers
+from Containment import Containment
+
 
 class PortManager():
-    GLBA_BOUNDARY = gpd.read_file(r'./data/shapes/port_GLBA.shp')
-    GLBA_BOUNDARY = GLBA_BOUNDARY.set_crs(epsg=4326)
-    DOCK_BUFFERS = gpd.read_file(r'./data/buffers/docks_albers_2000m_buffer.dbf')
-    #DOCK_BUFFERS = DOCK_BUFFERS.set_crs(epsg=4326)
+    GLBA_BOUNDARY = ReferenceLayer('port_glba') # shared with BoatData, read once on first access
+    DOCK_BUFFERS = ReferenceLayer('dock_buffers')
     
     def __init__(self, geoprocessor):
         self.geoprocessor = geoprocessor
@@ -15,9 +16,6 @@ class PortManager():
     @staticmethod
     def populate_status_and_ports(df):
         """determines if rows are inPort or inTransit and updates cruise_geodata table"""
-        search_area = PortManager.DOCK_BUFFERS
-        search_area = search_area.to_crs(4326)
-
         if not isinstance(df, gpd.GeoDataFrame):
             raise TypeError("df must be of type GeoDataFrame")
     
@@ -26,18 +24,13 @@ class PortManager():
         df['port'] = None # default port field to None
         df['status'] = None  # Default status field to 'inTransit'
 
-        # Iterate over all ports in the search area, check if any points intersect and are at rest/moored
-        for _, buffer in search_area.iterrows():
-            withinPortBoundary = df[df.geometry.intersects(buffer.geometry)]
-            mooredPoints = df[(df.sog == 0) | (df.nav_status == 'Moored')]
-            intersection = withinPortBoundary.index.intersection(mooredPoints.index)
+        # Moored/at rest points are filtered once and matched to the dock buffers with one spatial join
+        ports = PortManager.classifyMooredPoints(df)
+        df.loc[ports.index, 'port'] = ports.values
+        df.loc[ports.index, 'status'] = 'inPort'
 
-            if len(intersection) > 0: # if matches exist
-                df.loc[intersection, 'port'] = buffer['name']
-                df.loc[intersection, 'status'] = 'inPort'
-
-        df['port'].fillna('atSea', inplace=True)
-        df['status'].fillna('inTransit', inplace=True)
+        df['port'] = df['port'].fillna('atSea')
+        df['status'] = df['status'].fillna('inTransit')
 
         port_changes = df['port'].ne(df['port'].shift())
         df['next_port'] = df['port'].where(port_changes).shift(-1).bfill()
@@ -46,6 +39,24 @@ class PortManager():
 
         return df
 
+    @staticmethod
+    def classifyMooredPoints(df):
+        """Returns the dock name of every moored or at rest point (sog == 0 or nav_status 'Moored') inside a dock buffer,
+           as a Series indexed like df. The points are matched with a single STRtree backed spatial join, so the cost
+           grows with the number of points rather than points x docks. Where buffers overlap the last buffer wins,
+           as when the buffers were applied one after another.
+        """
+        search_area = ReferenceLayers.get('dock_buffers', 4326)
+        moored = df.loc[(df.sog == 0) | (df.nav_status == 'Moored'), ['geometry']]
+        moored = moored[Containment.mask(moored, 'dock_buffers')] # grid lookup drops points far from every dock before the join
+        if moored.empty:
+            return pd.Series(dtype=object)
+
+        joined = gpd.sjoin(moored, search_area[['name', 'geometry']].reset_index(drop=True), how='inner', predicate='intersects')
+        joined = joined.sort_values('index_right', kind='stable')
+        joined = joined[~joined.index.duplicated(keep='last')]
+        return joined['name']
+
     @staticmethod
     def identify_status_changes(df):
         """detects change in state over course of AIS data, assigns incremental IDs 
@@ -67,8 +78,7 @@ class PortManager():
         Port location is determined by containment of an AIS point within a 2km circular buffer around ports of interest.
         Adds columns: 'port', 'status' (either 'inPort' or 'inTransit'), and 'next_port' to the DataFrame.
         """
-        search_area = PortManager.DOCK_BUFFERS.to_crs(4326)
-
+        cruise.ensureGeometry() # point geometry for the spatial test below
         cruise.data['port'] = None # default port field to None
         cruise.data['status'] = 'inTransit'  # Default status field to 'inTransit'
         cruise.data['next_port'] = None #default next_port
@@ -83,47 +93,36 @@ class PortManager():
         cruise.data.at[cruise.data.index[-1], 'status'] = 'inPort'
 
         
-        # Iterate over all ports in the search area, check if any points intersect and are at rest/moored
-        for _, buffer in search_area.iterrows():
-            intersecting_points1 = cruise.data[cruise.data.geometry.intersects(buffer.geometry)]
-            intersecting_points2 = cruise.data[(cruise.data.sog == 0) | (cruise.data.nav_status == 'Moored')]
-            intersecting_indices = intersecting_points1.index.intersection(intersecting_points2.index)
-
-            if len(intersecting_indices) > 0:
-                cruise.data.loc[intersecting_indices, 'port'] = buffer['name']
-                cruise.data.loc[intersecting_indices, 'status'] = 'inPort'
-                #print('populating column for', buffer['name'])
-                #print(f'There were {len(intersecting_points1)} points within the geofence and  {len(intersecting_points2)} moored or at rest, populating {len(intersecting_indices)} entries in the column')
-            else:
-                pass
-                #print('no entries for', buffer['name'])
+        # Moored/at rest points within a dock buffer, matched with one spatial join
+        ports = PortManager.classifyMooredPoints(cruise.data)
+        cruise.data.loc[ports.index, 'port'] = ports.values
+        cruise.data.loc[ports.index, 'status'] = 'inPort'
 
         # Create a new column with backward filled values
-        cruise.data['filled_port'] = cruise.data['port'].fillna(method='bfill')
+        cruise.data['filled_port'] = cruise.data['port'].bfill()
         # Update NaN values in the original 'port' column to be 'to' + the filled value
-        cruise.data['next_port'] = cruise.data.apply(lambda row: f"to{row['filled_port']}" if pd.isna(row['port']) else row['port'], axis=1)
+        cruise.data['next_port'] = np.where(cruise.data['port'].isna(), 'to' + cruise.data['filled_port'].astype(str), cruise.data['port'])
 
     @staticmethod
     def visitsGlacierBay(cruise) -> bool:
-        """returns true if the cruise enters the park boundary of GLBA. else false
+        """returns true if the cruise enters the park boundary of GLBA. else false. Computed once per cruise
         """
-        return any(cruise.data.intersects(PortManager.GLBA_BOUNDARY.unary_union))
+        return Containment.visits(cruise, 'port_glba')
     
     @staticmethod
     def visitsGlacierBay2(segment_node) -> bool:
         """returns true if the cruise enters the park boundary of GLBA. else false
         """
-        return any(segment_node.intersects(PortManager.GLBA_BOUNDARY.unary_union))
+        return Containment.intersectsAny(segment_node, 'port_glba')
     
     @staticmethod
     def visitsPort(cruise, portName) -> bool:
         """returns true if the cruise enters the geofence of the portName
         """
-        search_area = PortManager.DOCK_BUFFERS
+        search_area = ReferenceLayers.get('dock_buffers', 4326) # reprojected once and cached
         search_area = search_area[search_area['name']==portName]
-        search_area = search_area.to_crs(4326)
 
-        return any(cruise.data.intersects(search_area.unary_union))
+        return Containment.intersectsAny(cruise.data, search_area)
     
     @staticmethod # check functionality
     def getNextPort(data, current_index):
@@ -187,23 +186,7 @@ class PortManager():
         """Populates new inGLBA column as True or false depending on intersection with the GLBA boundary polygon. 
            Will be used to determine exit time from GLBA
         """
-        search_area = PortManager.GLBA_BOUNDARY
-        search_area = search_area.to_crs(4326)
-        self.geoprocessor.gdf['inGLBA'] = None #initialize column and set default to None type
-        
-        intersecting_points = self.geoprocessor.gdf[self.geoprocessor.gdf.geometry.intersects(search_area.geometry.unary_union)]
-        intersecting_indices = intersecting_points.index
-        if not intersecting_indices.empty:
-            self.geoprocessor.gdf.loc[intersecting_indices, 'inGLBA'] = True
-
-            last_true_index = intersecting_indices[-1]
-            next_index = self.geoprocessor.gdf.index[self.geoprocessor.gdf.index > last_true_index][0] if last_true_index < self.geoprocessor.gdf.index[-1] else None
-
-            #print(f"Last True Index: {last_true_index}, Next Index: {next_index}")
-        else:
-            print("No intersecting points found.")
-
-        return next_index
+        return self.geoprocessor.fillPointsWithinGlacierBay()
      
     ##### GLACIER BAY ANALYSIS #####
 
@@ -0,0 +1,70 @@
+# Reprojection of ping coordinates through shared pyproj transformers, kept as projected x/y columns next to lat/lon
+import numpy as np
+from pyproj import Transformer
+
+
+class Projector():
+    ALBERS = 3338 # Alaska Albers, metres
+    ALASKA = 6394 # NAD83(2011) Alaska Albers, metres, used for the rasters
+    BATCH = 1 << 20 # points transformed per call, bounds the temporary arrays on full-season frames
+
+    _transformers = {} # (source epsg, target epsg) -> Transformer
+
+    ####### TRANSFORMERS #######
+
+    @staticmethod
+    def transformer(source, target):
+        """returns the (always x/y ordered) transformer between two crs, built once per process"""
+        key = (source, target)
+        if key not in Projector._transformers:
+            Projector._transformers[key] = Transformer.from_crs(source, target, always_xy = True)
+        return Projector._transformers[key]
+
+    @staticmethod
+    def project(x, y, target, source = 4326):
+        """returns x/y arrays transformed from source to target, in batches of BATCH points"""
+        x = np.asarray(x, dtype = np.float64)
+        y = np.asarray(y, dtype = np.float64)
+        transformer = Projector.transformer(source, target)
+        px, py = np.empty_like(x), np.empty_like(y)
+        for start in range(0, len(x), Projector.BATCH):
+            stop = start + Projector.BATCH
+            px[start:stop], py[start:stop] = transformer.transform(x[start:stop], y[start:stop])
+        return px, py
+
+    ####### PROJECTED COLUMNS #######
+
+    @staticmethod
+    def columns(epsg):
+        return f'x_{epsg}', f'y_{epsg}'
+
+    @staticmethod
+    def projectedXY(data, epsg):
+        """returns the x/y arrays of data's pings in epsg and stores them as x_<epsg>/y_<epsg> columns. Rows that already
+           carry projected coordinates are reused, only the missing ones (e.g. groups concatenated in later) are transformed.
+        """
+        x_column, y_column = Projector.columns(epsg)
+        if x_column in data.columns and not data[x_column].isna().any():
+            return data[x_column].to_numpy(), data[y_column].to_numpy()
+
+        if 'lon' in data.columns and 'lat' in data.columns:
+            x, y, source = data['lon'].to_numpy(dtype = np.float64), data['lat'].to_numpy(dtype = np.float64), 4326
+        else:
+            x, y, source = data.geometry.x.to_numpy(), data.geometry.y.to_numpy(), data.crs.to_epsg()
+
+        if x_column in data.columns:
+            px, py = data[x_column].to_numpy(dtype = np.float64, copy = True), data[y_column].to_numpy(dtype = np.float64, copy = True)
+            missing = np.flatnonzero(np.isnan(px))
+            px[missing], py[missing] = Projector.project(x[missing], y[missing], epsg, source)
+        else:
+            px, py = Projector.project(x, y, epsg, source)
+        data[x_column] = px
+        data[y_column] = py
+        return px, py
+
+    @staticmethod
+    def addProjectedColumns(data, epsgs = (ALBERS, ALASKA)):
+        """adds x/y columns for every epsg in epsgs to data, returns data"""
+        for epsg in epsgs:
+            Projector.projectedXY(data, epsg)
+        return data
@@ -0,0 +1,113 @@
+# Registry of the geospatial reference layers, each read once on first access and shared by every class
+import os
+import pickle
+import shapely
+import geopandas as gpd
+
+from FileSignature import FileSignature
+
+
+class ReferenceLayers():
+    # name -> (path, crs of the source when the file does not declare one)
+    LAYERS = {
+        'glba_geofence': (r'./data/shapes/GlacierBayGeofence.shp', 4326),
+        'port_glba': (r'./data/shapes/port_GLBA.shp', 4326),
+        'nps_boundary_glba': (r'./data/shapes/nps_boundary_glba.shp', 4326),
+        'dock_buffers': (r'./data/buffers/docks_albers_2000m_buffer.shp', 3338),
+        'alaska_coastline': (r'./data/shapes/Alaska_Coastline/Alaska_Coastline.shp', None),
+    }
+    SIDECARS = ['.shx', '.dbf', '.prj', '.cpg'] # shapefile parts besides the .shp that change what is read
+    CACHE_FOLDER = r'./data/cache/layers'
+
+    _layers = {} # (name, epsg) -> GeoDataFrame
+    _unions = {} # (name, epsg) -> prepared shapely geometry
+
+    ####### ACCESS #######
+
+    @staticmethod
+    def get(name, epsg = None):
+        """returns the named layer, reprojected to epsg if given. Each (layer, crs) pair is built once per process"""
+        key = (name, epsg)
+        if key not in ReferenceLayers._layers:
+            if epsg is None:
+                ReferenceLayers._layers[key] = ReferenceLayers._read(name)
+            else:
+                ReferenceLayers._layers[key] = ReferenceLayers._cached(name, epsg, lambda: ReferenceLayers.get(name).to_crs(epsg = epsg))
+        return ReferenceLayers._layers[key]
+
+    @staticmethod
+    def union(name, epsg = 4326):
+        """returns the unary union of the named layer as a prepared geometry, ready for repeated predicate tests"""
+        key = (name, epsg)
+        if key not in ReferenceLayers._unions:
+            geometry = ReferenceLayers.unionOf(ReferenceLayers.get(name, epsg).geometry)
+            shapely.prepare(geometry)
+            ReferenceLayers._unions[key] = geometry
+        return ReferenceLayers._unions[key]
+
+    @staticmethod
+    def unionOf(geometries):
+        """unary union of a GeoSeries, through union_all where geopandas has it (unary_union is deprecated from 1.0)"""
+        return geometries.union_all() if hasattr(geometries, 'union_all') else geometries.unary_union
+
+    @staticmethod
+    def keyOf(layer):
+        """returns the (name, epsg) a layer frame was handed out under, or None for a frame built elsewhere"""
+        for key, registered in ReferenceLayers._layers.items():
+            if registered is layer:
+                return key
+        return None
+
+    @staticmethod
+    def signature(name):
+        """(size, mtime) of the layer's .shp and of each of its SIDECARS present, the key of everything cached from it"""
+        path = ReferenceLayers.LAYERS[name][0]
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"reference layer '{name}': {path} does not exist")
+        stem = os.path.splitext(path)[0]
+        paths = [path] + [stem + extension for extension in ReferenceLayers.SIDECARS if os.path.exists(stem + extension)]
+        return tuple((os.path.basename(part),) + tuple(FileSignature.signature(part).values()) for part in paths)
+
+    @staticmethod
+    def clear():
+        """drops the in-memory layers, e.g. after a source shapefile was edited"""
+        ReferenceLayers._layers.clear()
+        ReferenceLayers._unions.clear()
+
+    ####### LOADING #######
+
+    @staticmethod
+    def _read(name):
+        path, default_crs = ReferenceLayers.LAYERS[name]
+        def read():
+            layer = gpd.read_file(path)
+            if layer.crs is None and default_crs is not None:
+                layer = layer.set_crs(epsg = default_crs)
+            return layer
+        return ReferenceLayers._cached(name, None, read)
+
+    @staticmethod
+    def _cached(name, epsg, build):
+        """returns build() through a pickle in CACHE_FOLDER, keyed on the source files' sizes and mtimes (see signature)"""
+        signature = ReferenceLayers.signature(name)
+        cache_path = os.path.join(ReferenceLayers.CACHE_FOLDER, f"{name}_{epsg or 'source'}.pkl")
+        if os.path.exists(cache_path):
+            with open(cache_path, 'rb') as f:
+                cached = pickle.load(f)
+            if cached['signature'] == signature:
+                return cached['layer']
+        layer = build()
+        os.makedirs(ReferenceLayers.CACHE_FOLDER, exist_ok = True)
+        with open(cache_path, 'wb') as f:
+            pickle.dump({'signature': signature, 'layer': layer}, f, protocol = pickle.HIGHEST_PROTOCOL)
+        return layer
+
+
+class ReferenceLayer():
+    """Class attribute that resolves to a registered layer on first access, e.g. GLBA_BOUNDARY = ReferenceLayer('port_glba')"""
+    def __init__(self, name, epsg = None):
+        self.name = name
+        self.epsg = epsg
+
+    def __get__(self, instance, owner):
+        return ReferenceLayers.get(self.name, self.epsg)
@@ -1,4 +1,4 @@
-from PortManager import PortManager
+from Containment import Containment
 
 class SegmentNode:
     def __init__(self, data, segmentID = None, prev = None, next = None):
@@ -6,8 +6,9 @@ class SegmentNode:
         self.segmentID = segmentID
         self.prev = prev
         self.next = next
+        self.visitFlags = {} # layer name -> bool, see Containment.visits
 
     def visitsGlacierBay(self):
-        return any(self.data.intersects(PortManager.GLBA_BOUNDARY.unary_union))
+        return Containment.visits(self, 'port_glba')
      
     
\ No newline at end of file
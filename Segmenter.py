@@ -0,0 +1,53 @@
+# Vectorized cruise segmentation: assigns cruise numbers to a vessel's whole season of pings in one pass
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+
+class Segmenter():
+
+    @staticmethod
+    def cruiseNumbers(timestamps, groupKeys = None, threshold = pd.Timedelta(hours = 10)):
+        """Returns a cruise number (starting at 1) for every ping of a time-sorted int64 ns timestamp array.
+           A new cruise starts where the gap to the previous ping exceeds threshold. With groupKeys (the file each
+           ping came from) breaks are only allowed between groups, as when cruises are built one group at a time.
+        """
+        timestamps = np.asarray(timestamps, dtype = np.int64)
+        if len(timestamps) == 0:
+            return np.zeros(0, dtype = np.int32)
+        breaks = np.diff(timestamps) > threshold.value
+        if groupKeys is not None:
+            groupKeys = np.asarray(groupKeys)
+            breaks &= groupKeys[1:] != groupKeys[:-1]
+        numbers = np.empty(len(timestamps), dtype = np.int32)
+        numbers[0] = 1
+        numbers[1:] = 1 + np.cumsum(breaks)
+        return numbers
+
+    @staticmethod
+    def _cruiseNumbers(args):
+        """unpacks (timestamps, groupKeys, threshold) for executor.map"""
+        return Segmenter.cruiseNumbers(*args)
+
+    @staticmethod
+    def segmentFleet(fleet, threshold = pd.Timedelta(hours = 10), workers = 1):
+        """Segments every vessel of fleet, a dict of boatName -> (timestamps, groupKeys) arrays.
+           Vessels are independent, so with more than one worker they are segmented in a process pool.
+           Only the compact arrays are sent to the workers. Returns a dict of boatName -> cruise numbers in fleet order.
+        """
+        names = list(fleet)
+        jobs = [(fleet[name][0], fleet[name][1], threshold) for name in names]
+        if workers is None or workers > 1:
+            with ProcessPoolExecutor(max_workers = workers) as executor:
+                results = list(executor.map(Segmenter._cruiseNumbers, jobs))
+        else:
+            results = [Segmenter._cruiseNumbers(job) for job in jobs]
+        return dict(zip(names, results))
+
+    @staticmethod
+    def segmentBounds(numbers):
+        """returns (start, stop) positions of each run of equal cruise numbers"""
+        bounds = np.flatnonzero(np.diff(numbers)) + 1
+        starts = np.concatenate([[0], bounds])
+        stops = np.concatenate([bounds, [len(numbers)]])
+        return list(zip(starts.tolist(), stops.tolist()))
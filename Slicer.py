@@ -2,6 +2,9 @@ import pandas as pd
 import pytz
 
 class Slicer():
+    LOCAL_TIMEZONE = pytz.timezone('US/Alaska')
+    TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
     def __init__(self, cruise_data):
         self.cruise = cruise_data
         self.thinned = None
@@ -11,11 +14,27 @@ class Slicer():
     @staticmethod
     def orderGroupByTime(group):
         """Sorst the input group chronologically (timestamps) and returns the group 
-           in the new order with AKDT timestamps.
+           in the new order with UTC timestamps. Timestamps parsed at ingestion are not parsed again.
         """
-        group['bs_ts'] = pd.to_datetime(group['bs_ts'], utc = True).dt.tz_convert(pytz.timezone('US/Alaska'))
-        group.sort_values(by='bs_ts', inplace=True)
+        if not isinstance(group['bs_ts'].dtype, pd.DatetimeTZDtype):
+            group['bs_ts'] = Slicer.parseTimestamps(group['bs_ts'])
+        group = group.sort_values(by='bs_ts', kind='stable')
         return group.reset_index(drop=True)
+
+    @staticmethod
+    def parseTimestamps(timestamps):
+        """parses AIS timestamp strings to UTC with the fixed archive format, inferring the format only if that fails"""
+        try:
+            return pd.to_datetime(timestamps, format = Slicer.TIMESTAMP_FORMAT, utc = True)
+        except ValueError:
+            return pd.to_datetime(timestamps, utc = True)
+
+    @staticmethod
+    def toLocalTime(timestamps):
+        """returns an AKDT view of UTC timestamps, for analyses and exports that report local times"""
+        if isinstance(timestamps, pd.Series):
+            return timestamps.dt.tz_convert(Slicer.LOCAL_TIMEZONE)
+        return timestamps.tz_convert(Slicer.LOCAL_TIMEZONE)
     
     ####### WRANGLING #######
 
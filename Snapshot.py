@@ -0,0 +1,67 @@
+# Persisted BoatsData state (vessels, cruises, cruise extents) and the manifest of files it was built from
+import os
+import pickle
+
+from FileSignature import FileSignature
+
+
+class Snapshot():
+    SNAPSHOT_PATH = r'./data/cache/boatsData.pkl'
+
+    def __init__(self, path = SNAPSHOT_PATH):
+        self.path = path
+        self.boatsData = None
+        self.manifest = {} # relative file path -> {'size', 'mtime', 'sha1', 'rows'} of every ingested file
+        self.rowsParsedCount = 0
+
+    ####### LOADING AND SAVING #######
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def load(self):
+        """reads the pickled state written by save. Returns self for chaining"""
+        with open(self.path, 'rb') as f:
+            state = pickle.load(f)
+        self.boatsData = state['boatsData']
+        self.manifest = state['manifest']
+        self.rowsParsedCount = state['rowsParsedCount']
+        return self
+
+    def save(self):
+        """pickles the state next to the cache, writing to a temporary file first so a failed write keeps the old snapshot"""
+        os.makedirs(os.path.dirname(self.path), exist_ok = True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump({'boatsData': self.boatsData, 'manifest': self.manifest, 'rowsParsedCount': self.rowsParsedCount}, f, protocol = pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.path)
+
+    ####### MANIFEST #######
+
+    def record(self, dataFolder, file_path, rowCount):
+        """adds an ingested file to the manifest"""
+        key = os.path.relpath(file_path, dataFolder)
+        self.manifest[key] = dict(FileSignature.signature(file_path, withHash = True), rows = rowCount)
+
+    def compare(self, dataFolder, file_paths):
+        """splits file_paths into (new, changed) relative to the manifest. Files recorded in the manifest
+           that are no longer present count as changed, since their rows are still in the snapshot.
+        """
+        new, changed = [], []
+        present = set()
+        for file_path in file_paths:
+            key = os.path.relpath(file_path, dataFolder)
+            present.add(key)
+            recorded = self.manifest.get(key)
+            if recorded is None:
+                new.append(file_path)
+                continue
+            current = FileSignature.signature(file_path)
+            if current['size'] == recorded['size'] and current['mtime'] == recorded['mtime']:
+                continue
+            if current['size'] == recorded['size'] and FileSignature.contentHash(file_path) == recorded['sha1']:
+                recorded['mtime'] = current['mtime'] # touched but identical
+                continue
+            changed.append(file_path)
+        changed.extend(os.path.join(dataFolder, key) for key in self.manifest if key not in present)
+        return new, changed
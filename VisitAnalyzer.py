@@ -0,0 +1,171 @@
+# Entry/exit, next-port and transit metrics of every vessel for a set of named areas, evaluated in one pass per vessel
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+from concurrent.futures import ProcessPoolExecutor
+
+from PortManager import PortManager
+from Geoprocessor import Geoprocessor
+from Containment import Containment
+from GeofenceEvents import GeofenceEvents
+from ReferenceLayers import ReferenceLayers
+from PathCalculations import PathCalculations
+from Slicer import Slicer
+
+
+class VisitAnalyzer():
+    # columns read from each vessel, and the ones the track preparation adds to the points returned
+    COLUMNS = ['lat', 'lon', 'sog', 'nav_status', 'bs_ts']
+    ADDED_COLUMNS = ['port', 'status', 'next_port', 'previous_port', 'segment_id', PathCalculations.CUMULATIVE_DISTANCE, PathCalculations.ELAPSED_TIME]
+
+    def __init__(self, areas, predicate = 'within'):
+        """areas maps a name to a registered layer name, a layer frame handed out by ReferenceLayers, any GeoDataFrame or a shapely geometry.
+           Registered layers are tested through their GridIndex, other areas are unioned and prepared once here.
+        """
+        self.areas = {name: VisitAnalyzer.areaSpec(area) for name, area in areas.items()}
+        self.predicate = predicate
+
+    @staticmethod
+    def areaSpec(area):
+        """(layer name, epsg) for registered layers, else the area's prepared union. Both are cheap to send to a worker"""
+        key = Containment.registeredKey(area) # points are tested as lon/lat, whatever crs a registered frame came in
+        return key if key is not None else Containment.geometry(area)
+
+    def inside(self, data, name):
+        """boolean array of data's points inside the named area"""
+        spec = self.areas[name]
+        if isinstance(spec, tuple):
+            return Containment.mask(data, spec[0], self.predicate, epsg = spec[1])
+        return Containment.mask(data, spec, self.predicate)
+
+    ####### RUNNING #######
+
+    def run(self, boatsData, workers = 1):
+        """Returns (visit table, points between each area exit and the next port) for every vessel and area, both with an
+           'area' column. Each vessel's track is prepared once (ports, status segments, path prefix columns) and shared by
+           all areas. With more than one worker (None for one per core) vessels are processed in a process pool; workers
+           only receive the arrays in COLUMNS and results are merged in boatsDataDictionary order.
+        """
+        flattened = {boatName: boatData.flattenedCruises(geometry = False) for boatName, boatData in boatsData.boatsDataDictionary.items()} # read for the jobs and again for the tracks
+        jobs = ((self, boatName, VisitAnalyzer.vesselArrays(data)) for boatName, data in flattened.items())
+        if workers is None or workers > 1:
+            with ProcessPoolExecutor(max_workers = workers) as executor:
+                results = list(executor.map(VisitAnalyzer._analyzeVessel, jobs))
+        else:
+            results = map(VisitAnalyzer._analyzeVessel, jobs)
+
+        visit_tables, tracks = [], []
+        for data, areaResults in zip(flattened.values(), results):
+            for name, (visits, between_positions, between_columns) in areaResults.items():
+                if len(visits):
+                    visits.insert(0, 'area', name)
+                    visit_tables.append(visits)
+                between = Geoprocessor.dataToGeodata(data.iloc[between_positions]).assign(**between_columns)
+                tracks.append(between.assign(area = name))
+
+        visit_table = pd.concat(visit_tables, ignore_index=True) if visit_tables else pd.DataFrame()
+        tracks = pd.concat([gpd.GeoDataFrame(df, geometry='geometry', crs="EPSG:4326") for df in tracks], ignore_index=True) if tracks else gpd.GeoDataFrame()
+        return visit_table, tracks
+
+    @staticmethod
+    def vesselArrays(data):
+        """the compact arrays of a vessel's flattened season that the analysis reads, sent to a worker instead of the frame"""
+        return {column: data[column].array if column == 'nav_status' else data[column].values for column in VisitAnalyzer.COLUMNS} # bs_ts as UTC datetime64, not Timestamp objects
+
+    @staticmethod
+    def prepareTrack(arrays):
+        """rebuilds a vessel's pings from its arrays and adds ports, status segments and the path prefix columns"""
+        data = pd.DataFrame(arrays)
+        data['bs_ts'] = data['bs_ts'].dt.tz_localize('UTC')
+        data = Geoprocessor.dataToGeodata(data)
+
+        data = PortManager.populate_status_and_ports(data)
+        data = PortManager.identify_status_changes(data)
+        return PathCalculations.addPrefixColumns(data) # every interval below is a subtraction of these columns
+
+    @staticmethod
+    def _analyzeVessel(job):
+        """runs every area for one vessel. Returns area name -> (visit rows, positions of the points between area exit and
+           the next port, those points' values of ADDED_COLUMNS)
+        """
+        analyzer, boatName, arrays = job
+        data = VisitAnalyzer.prepareTrack(arrays)
+        results = {}
+        for name in analyzer.areas:
+            visits, between = VisitAnalyzer.areaVisits(boatName, data, analyzer.inside(data, name))
+            results[name] = (visits, between.index.to_numpy(), {column: between[column].to_numpy() for column in VisitAnalyzer.ADDED_COLUMNS})
+        return results
+
+    ####### VISITS #######
+
+    @staticmethod
+    def ranges(starts, lengths):
+        """positions of the consecutive ranges [start, start + length) one after the other, with the range number of each"""
+        numbers = np.repeat(np.arange(len(starts)), lengths)
+        offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        return np.repeat(starts, lengths) + offsets, numbers
+
+    @staticmethod
+    def areaVisits(boatName, data, inside):
+        """Summarises every visit of one vessel to one area at once. data is the vessel's prepared track (see prepareTrack) on a
+           RangeIndex, inside the boolean mask of its points in the area. A visit is a status segment with points inside the area:
+           the geofence runs of the mask (see GeofenceEvents.runs, cut at segment changes) grouped by segment. It is measured from
+           its last point in the area to the first point of the next segment (the next port).
+           Returns (visit rows, points between area exit and the next port).
+        """
+        ##### SEGMENT BOUNDARIES #####
+        segment_ids = data['segment_id'].to_numpy()
+        entries, exits = GeofenceEvents.runs(np.asarray(inside, dtype = bool), segment_ids)
+        if len(entries) == 0:
+            return pd.DataFrame(), data.iloc[0:0]
+        segment_first = np.flatnonzero(np.r_[True, segment_ids[1:] != segment_ids[:-1]]) # segments are contiguous runs
+        segment_last = np.r_[segment_first[1:] - 1, len(data) - 1]
+
+        ##### AREA ENTRY AND EXIT PER VISIT #####
+        run_segment = np.searchsorted(segment_first, entries, side = 'right') - 1
+        first_run = np.r_[True, run_segment[1:] != run_segment[:-1]]
+        start_index = entries[first_run] # first point in the area
+        end_index = exits[np.r_[first_run[1:], True]] # last point in the area -> 'exit line'
+        start_index_next_port = segment_last[run_segment[first_run]] + 1
+
+        timestamps = data['bs_ts']
+        within, within_run = VisitAnalyzer.ranges(entries, exits - entries + 1) # every point of the runs
+        within_visit = (np.cumsum(first_run) - 1)[within_run]
+        within_times = pd.DataFrame({'visit': within_visit, 'bs_ts': timestamps.iloc[within].reset_index(drop = True)})
+        bounds = within_times.groupby('visit')['bs_ts'].agg(['min', 'max'])
+        within_times['date'] = Slicer.toLocalTime(within_times['bs_ts']).dt.date
+        dates = within_times.drop_duplicates(['visit', 'date']).groupby('visit')['date'].agg(list)
+
+        ##### POINTS BETWEEN AREA EXIT AND NEXT PORT #####
+        between_start = end_index + 1 # from the point after the last one in the area up to one before mooring in the next port
+        between_length = np.maximum(start_index_next_port - 1 - between_start, 0)
+        between_positions, between_visit = VisitAnalyzer.ranges(between_start, between_length)
+        between = data.iloc[between_positions]
+        sog = between['sog'].groupby(between_visit).agg(['mean', 'max']).reindex(np.arange(len(end_index)))
+
+        ##### TIME AND DISTANCE TO THE NEXT PORT #####
+        in_bounds = start_index_next_port < len(data) # the last segment of the season has no next port
+        for position in start_index_next_port[~in_bounds]:
+            print(f"Warning: start_index_next_port {position} is out of bounds. Assigning default values for {boatName}.")
+        next_port = np.where(in_bounds, start_index_next_port, end_index)
+        elapsed = data[PathCalculations.ELAPSED_TIME].to_numpy()
+        cumulative = data[PathCalculations.CUMULATIVE_DISTANCE].to_numpy()
+        timelapse_to_next_port = np.where(in_bounds, np.round((elapsed[next_port] - elapsed[end_index]) / 3600, 2), np.nan)
+        distance_to_next_port = np.where(in_bounds, np.round((cumulative[next_port] - cumulative[end_index]) / PathCalculations.METERS_PER_NM, 2), np.nan)
+
+        visits = pd.DataFrame({
+            'date': dates.to_numpy(),
+            'boatName': boatName,
+            'mmsi': 'num',
+            'portAfter': data['next_port'].to_numpy()[end_index].astype(str),
+            'portBefore': data['previous_port'].to_numpy()[end_index].astype(str),
+            'ts_in': Slicer.toLocalTime(bounds['min']), # reported in AKDT like the CLAA schedule
+            'ts_out': Slicer.toLocalTime(bounds['max']),
+            'timeTo': timelapse_to_next_port,
+            'distTo': distance_to_next_port,
+            'mean_sog': sog['mean'].to_numpy(),
+            'max_sog': sog['max'].to_numpy(),
+            'segment_id': segment_ids[end_index],
+        })
+        return visits, between
+
@@ -5,6 +5,10 @@ from Cruise import Cruise
 from BoatData import BoatData
 from BoatsData import BoatsData
 from Geoprocessor import Geoprocessor
+from Ingestor import Ingestor
+from AISCache import AISCache
+from AISSchema import AISSchema
+from Snapshot import Snapshot
 
 import os
 import secrets
@@ -23,10 +27,20 @@ import pandas as pd
 
 
 class App:
-    def __init__(self, dataFolder):
+    def __init__(self, dataFolder, workers = 1, useCache = False, columns = None, engine = 'grouped', snapshot = None):
         self.boatsData = BoatsData()  # Initialize BoatsData instance
         self.rowsParsedCount = 0
-        self.populateBoatsData(dataFolder)  # Populate boatsData with data from CSV files
+        self.workers = workers # processes used to read and group files, None uses every core
+        self.cache = AISCache() if useCache else None # serve the daily csv files from the parquet cache in data/cache/ais
+        self.columns = columns # e.g. ['bs_ts', 'name', 'lat', 'lon', 'sog', 'nav_status'] to load only what an analysis needs
+        self.engine = engine # 'grouped' builds cruises group by group, 'vectorized' segments each vessel's whole season at once
+        self.ingestedFiles = [] # (file_path, rowCount) of the files read by populateBoatsData
+        if snapshot:
+            self.snapshot = Snapshot(Snapshot.SNAPSHOT_PATH if snapshot is True else snapshot)
+            self.updateBoatsData(dataFolder) # load the persisted state and ingest only new files
+        else:
+            self.snapshot = None
+            self.populateBoatsData(dataFolder)  # Populate boatsData with data from CSV files
         # self.boatsData.initializeStatistics()
 
 
@@ -47,23 +61,72 @@ class App:
         print(f'Expected point count: {self.rowsParsedCount}, actual point count: {sum_of_points}, nan point count: {len(self.boatsData.nanData)}, condition is: {sum_of_points+len(self.boatsData.nanData) == self.rowsParsedCount}')
         return 'here ya go'
 
-    def populateBoatsData(self, dataFolder):
+    def populateBoatsData(self, dataFolder, file_paths = None, engine = None):
         tik = time.perf_counter()
         count=0
-        for dirs, _, files in os.walk(dataFolder):
-            for f in sorted(files):
-                if f.endswith('csv'):
-                    count+=1
-                    file_path = os.path.join(dirs, f)
-                    rows = pd.read_csv(file_path)  # Read CSV file into DataFrame
-                    #print(f'Starting parsing file: {f}')
-                    self.boatsData.parseRows(rows)  # Parse rows into boatsData
-                    self.rowsParsedCount += len(rows)
-                    #print(f'Finished parsing file: {f}')
+        engine = engine or self.engine
+        ingestor = Ingestor(dataFolder, self.workers, self.cache, self.columns)
+        if engine == 'vectorized':
+            fileGroups = []
+            for file_path, groups, rowCount in ingestor.readFiles(file_paths):
+                count+=1
+                fileGroups.append(groups)
+                self.rowsParsedCount += rowCount
+                self.ingestedFiles.append((file_path, rowCount))
+            self.boatsData.parseSeason(fileGroups, self.workers)
+        elif engine == 'grouped':
+            for file_path, groups, rowCount in ingestor.readFiles(file_paths): # files are read and grouped in parallel but yielded in order
+                count+=1
+                #print(f'Starting parsing file: {file_path}')
+                self.boatsData.parseGroups(groups)  # Parse grouped rows into boatsData
+                self.rowsParsedCount += rowCount
+                self.ingestedFiles.append((file_path, rowCount))
+                #print(f'Finished parsing file: {file_path}')
+        else:
+            raise ValueError(f"Unknown engine {engine}, expected 'grouped' or 'vectorized'")
+        self.boatsData.finalize() # build each Cruise.data once instead of on every added group
 
         tok = time.perf_counter()
         print(f"Imported data from {count} files in {tok - tik:0.4f} seconds")
         print(f"Parsed {self.rowsParsedCount} rows in this import.")
+        print(f"Cruise data in memory: {self.boatsData.memoryUsage():0.1f} MB")
+
+    def updateBoatsData(self, dataFolder):
+        """Incremental mode: loads the snapshot, ingests only files missing from its manifest and writes the snapshot back.
+           New files extend existing cruises or create new ones through the grouped path. If a file that was
+           already ingested changed or disappeared, its rows cannot be taken back out, so the state is rebuilt from scratch.
+        """
+        file_paths = Ingestor.listFiles(dataFolder)
+        engine = self.engine
+        if self.snapshot.exists():
+            self.snapshot.load()
+            new_files, changed_files = self.snapshot.compare(dataFolder, file_paths)
+            if changed_files:
+                print(f'{len(changed_files)} ingested files changed or were removed, rebuilding the snapshot: {changed_files}')
+                self.snapshot = Snapshot(self.snapshot.path)
+            else:
+                print(f'Loaded snapshot of {len(self.snapshot.manifest)} files, {len(new_files)} new files to ingest')
+                self.boatsData = self.snapshot.boatsData
+                self.rowsParsedCount = self.snapshot.rowsParsedCount
+                file_paths = new_files
+                engine = 'grouped' # only the grouped path can extend cruises that already exist
+
+        self.populateBoatsData(dataFolder, file_paths, engine)
+
+        for file_path, rowCount in self.ingestedFiles:
+            self.snapshot.record(dataFolder, file_path, rowCount)
+        self.snapshot.boatsData = self.boatsData
+        self.snapshot.rowsParsedCount = self.rowsParsedCount
+        self.snapshot.save()
+
+    def reportMemory(self, flattened = False):
+        """prints the memory held at each stage of the pipeline: cruises per boat, the whole season, and optionally the flattened copies"""
+        for boat_name, boat_data in self.boatsData.boatsDataDictionary.items():
+            AISSchema.reportMemory(f'{boat_name} cruises', [cruise.data for cruise in boat_data.cruisesDataDictionary.values()])
+        print(f'Season cruises: {self.boatsData.memoryUsage():0.1f} MB')
+        if flattened:
+            AISSchema.reportMemory('BoatData.flattenedCruises', [boat_data.flattenedCruises() for boat_data in self.boatsData.boatsDataDictionary.values()])
+            AISSchema.reportMemory('BoatsData.flatten', self.boatsData.flatten())
 
     def getRandomCruise(self):
         """returns a random cruise object for testing
@@ -0,0 +1,47 @@
+# Compares the vectorized distance engine with the original geopy loop on a synthetic track:
+# run from the repository root, e.g. python scripts/benchmark_distance.py 20000
+import sys
+import time
+sys.path.insert(0, '.')
+
+import numpy as np
+import geopandas as gpd
+from geopy.distance import geodesic
+
+from PathCalculations import PathCalculations
+
+
+def geopyLoop(geometry, start_index, end_index):
+    """the original per-leg implementation of distanceAlongPath"""
+    distances = []
+    for i in range(start_index, end_index):
+        point1 = geometry.iloc[i]
+        point2 = geometry.iloc[i + 1]
+        distances.append(geodesic((point1.y, point1.x), (point2.y, point2.x)).meters)
+    return np.array(distances)
+
+
+def syntheticTrack(n, seed = 0):
+    """a cruise-like track through Southeast Alaska: 1 minute pings at up to 20 kt"""
+    rng = np.random.default_rng(seed)
+    lon = -135.5 + np.cumsum(rng.normal(0, 0.004, n))
+    lat = 58.5 + np.cumsum(rng.normal(0, 0.002, n))
+    return gpd.GeoSeries(gpd.points_from_xy(lon, lat), crs='EPSG:4326')
+
+
+n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+geometry = syntheticTrack(n)
+
+t = time.time()
+reference = geopyLoop(geometry, 0, n - 1)
+loop_time = time.time() - t
+print(f'geopy loop:  {loop_time:8.3f} s for {n - 1} legs, total {reference.sum() / 1000:.3f} km')
+
+for mode in ['ellipsoidal', 'haversine']:
+    t = time.time()
+    legs, km, nm = PathCalculations.trackDistance(geometry, 0, n - 1, mode)
+    elapsed = time.time() - t
+    error = np.abs(legs - reference)
+    relative = np.max(error / np.where(reference > 0, reference, 1))
+    print(f'{mode:12s} {elapsed:8.3f} s ({loop_time / elapsed:6.0f}x), total {km:.3f} km / {nm:.3f} nm, '
+          f'max leg error {error.max():.2e} m ({relative:.2e} relative)')
@@ -0,0 +1,40 @@
+# Synthetic daily AIS files, laid out like the archive App reads
+import os
+
+import pandas as pd
+
+HEADER = ['bs_ts', 'mmsi', 'callsign', 'imo', 'name', 'nav_status', 'lat', 'lon', 'cog', 'sog', 'destination', 'eta', 'shiptype', 'draught', 'length', 'width']
+
+
+def track(name, mmsi, start, end, every = '20min', lat = 58.3, lon = -134.4):
+    """pings of one vessel every so often from start to end (UTC), heading south west"""
+    times = pd.date_range(start, end, freq = every)
+    return [{'bs_ts': ts.strftime('%Y-%m-%d %H:%M:%S'), 'name': name, 'mmsi': mmsi,
+             'lat': round(lat - i * 0.001, 6), 'lon': round(lon - i * 0.002, 6)} for i, ts in enumerate(times)]
+
+
+def writeDays(folder, pings, shuffle = False):
+    """writes pings (dicts with at least bs_ts, name, mmsi, lat and lon) into one csv file per UTC day under folder.
+       With shuffle the rows of each file are out of time order, as they can be in the archive. Returns the file paths
+    """
+    rows = pd.DataFrame(pings).reindex(columns = HEADER)
+    rows = rows.fillna({'nav_status': 'Under way using engine', 'sog': 10.0, 'cog': 180.0, 'shiptype': 'Passenger ship'})
+    paths = []
+    for day, rows_of_day in rows.groupby(rows['bs_ts'].str[:10]):
+        if shuffle:
+            rows_of_day = rows_of_day.sample(frac = 1, random_state = 0)
+        paths.append(os.path.join(folder, f'{day}.csv'))
+        rows_of_day.to_csv(paths[-1], index = False)
+    return paths
+
+
+def fleet():
+    """four days of three vessels: one sailing throughout, one with a two day gap between two cruises, one with a gap
+       inside a single file, and pings without a name
+    """
+    return (track('GRAND PRINCESS', 310327000, '2023-06-01 00:05', '2023-06-04 23:45')
+            + track('WESTERDAM', 244140580, '2023-06-01 03:00', '2023-06-02 06:00')
+            + track('WESTERDAM', 244140580, '2023-06-04 02:00', '2023-06-04 20:00', lat = 57.9)
+            + track('AMSTERDAM', 244958000, '2023-06-02 00:10', '2023-06-02 04:00')
+            + track('AMSTERDAM', 244958000, '2023-06-02 19:00', '2023-06-03 08:00', lat = 58.1)
+            + [dict(ping, name = None) for ping in track('', 338000000, '2023-06-03 01:00', '2023-06-03 02:00')])
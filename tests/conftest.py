@@ -0,0 +1,19 @@
+# The modules live at the repository root and read their data through paths relative to it
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from BoatNames import BoatNames
+
+
+@pytest.fixture(autouse = True)
+def repository(tmp_path, monkeypatch):
+    """runs every test from the repository root, with the name alias cache in the test's own folder"""
+    monkeypatch.chdir(ROOT)
+    monkeypatch.setattr(BoatNames, 'CACHE_FOLDER', str(tmp_path / 'names'))
+    monkeypatch.setattr(BoatNames, '_state', None)
+    return ROOT
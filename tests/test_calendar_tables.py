@@ -0,0 +1,80 @@
+# CalendarParser's vectorized table steps give the tables the row by row loops they replaced built
+import pandas as pd
+import pytest
+
+pytest.importorskip('pdfplumber') # read by CalendarParser at import
+from CalendarParser import CalendarParser
+
+
+def parser(rows):
+    """a parser whose table holds rows (date, boatName, portCode, ts_in, ts_out), as processPDF leaves it"""
+    parsed = CalendarParser('schedule.pdf', 'schedule.csv', 2023)
+    parsed.rows = [dict(zip(CalendarParser.COLUMNS, row)) for row in rows]
+    parsed.buildTable()
+    parsed.df['date'] = pd.to_datetime(parsed.df['date'])
+    return parsed
+
+
+def schedule():
+    """boats with days missing between calls, two calls on one day, a single call, unknown times and a row without a boat"""
+    day = pd.Timestamp
+    return [
+        (day('2023-06-01'), 'WESTERDAM', 'JNU', day('2023-06-01 07:00'), day('2023-06-01 16:00')),
+        (day('2023-06-04'), 'WESTERDAM', 'SGY', day('2023-06-04 07:00'), day('2023-06-04 18:00')),
+        (day('2023-06-04'), 'WESTERDAM', 'GB', 'unknown', 'unknown'),
+        (day('2023-06-02'), 'AMSTERDAM', 'KTN', day('2023-06-02 06:00'), day('2023-06-02 13:00')),
+        (day('2023-06-07'), 'AMSTERDAM', 'SIT', day('2023-06-07 08:00'), day('2023-06-07 17:00')),
+        (day('2023-06-03'), 'AMSTERDAM', 'JNU', day('2023-06-03 08:00'), day('2023-06-03 20:00')),
+        (day('2023-06-05'), 'SEVEN SEAS MARINER', 'ICY', day('2023-06-05 07:00'), day('2023-06-05 15:00')),
+        (day('2023-06-05'), None, 'JNU', day('2023-06-05 07:00'), day('2023-06-05 15:00')),
+    ]
+
+
+####### REFERENCE: THE LOOPS THE VECTORIZED STEPS REPLACED #######
+
+def createDailyRowsLoop(df):
+    new_rows = []
+    for boatName, group in df.groupby('boatName', dropna = True):
+        group = group.sort_values(by='date').reset_index(drop=True)
+        for date in pd.date_range(start=group['date'].min(), end=group['date'].max()):
+            if date not in group['date'].values:
+                new_rows.append({'date': date, 'boatName': boatName, 'portCode': 'AS',
+                                 'ts_in': pd.to_datetime(f"{date} 06:00"), 'ts_out': pd.to_datetime(f"{date} 22:00")})
+    if new_rows:
+        df = pd.concat([df, pd.DataFrame(new_rows)], ignore_index=True)
+        df = df.sort_values(by=['boatName', 'date']).reset_index(drop=True)
+    return df
+
+
+def fillNextPortsLoop(df):
+    df = df.copy()
+    df['nextPort'] = None
+    for index, row in df.iterrows():
+        next_index = df.index[(df['boatName'] == row['boatName']) & (df.index > index)].tolist()
+        if next_index:
+            df.loc[index, 'nextPort'] = df.loc[next_index[0], 'portName']
+    return df
+
+
+def test_daily_rows_match_loop():
+    vectorized = parser(schedule())
+    expected = createDailyRowsLoop(vectorized.df.copy())
+    vectorized.createDailyRows()
+    pd.testing.assert_frame_equal(vectorized.df, expected)
+    at_sea = vectorized.df[vectorized.df['portCode'] == 'AS']
+    assert sorted(zip(at_sea['boatName'], at_sea['date'].dt.day)) == [('AMSTERDAM', 4), ('AMSTERDAM', 5), ('AMSTERDAM', 6), ('WESTERDAM', 2), ('WESTERDAM', 3)]
+
+
+def test_next_ports_match_loop():
+    vectorized = parser(schedule())
+    vectorized.createDailyRows()
+    vectorized.convertCodesToNames()
+    expected = fillNextPortsLoop(vectorized.df)
+    vectorized.fillNextPorts()
+    pd.testing.assert_frame_equal(vectorized.df, expected)
+
+
+def test_empty_table():
+    empty = parser([])
+    empty.createDailyRows()
+    assert empty.df.empty
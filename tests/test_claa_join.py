@@ -0,0 +1,67 @@
+# AIS visits against the CLAA schedule (BoatsData.merge_ais_claa_data): which calls a visit is paired with
+import pandas as pd
+
+from BoatNames import BoatNames
+from BoatsData import BoatsData
+
+
+def visits(*rows):
+    """visit table rows (boatName, UTC ts_in, UTC ts_out), shaped like VisitAnalyzer's"""
+    return pd.DataFrame({'date': [[ts_in[:10]] for _, ts_in, _ in rows], 'boatName': [name for name, _, _ in rows],
+                         'portAfter': 'Skagway', 'portBefore': 'Juneau',
+                         'ts_in': [pd.Timestamp(ts_in, tz = 'UTC') for _, ts_in, _ in rows],
+                         'ts_out': [pd.Timestamp(ts_out, tz = 'UTC') for _, _, ts_out in rows]})
+
+
+def calls(*rows):
+    """CLAA schedule rows (boatName, date, Alaska ts_in, Alaska ts_out), shaped like the allyears csv"""
+    return pd.DataFrame({'date': [date for _, date, _, _ in rows], 'boatName': [name for name, _, _, _ in rows],
+                         'portCode': 'GB', 'portName': 'GLACIER BAY', 'nextPort': 'SKAGWAY',
+                         'ts_in': [ts_in for _, _, ts_in, _ in rows], 'ts_out': [ts_out for _, _, _, ts_out in rows]})
+
+
+def test_unresolved_name_matches_by_name():
+    assert BoatNames.resolve('WESTERDAM') == (None, None, None) # not in the vessel codes
+    merged = BoatsData.merge_ais_claa_data(visits(('WESTERDAM', '2023-06-01 16:00', '2023-06-01 20:00')),
+                                           calls(('WESTERDAM', '2023-06-01', '2023-06-01 09:00:00', '2023-06-01 11:00:00')))
+    assert len(merged) == 1
+    assert merged['boatName'].iloc[0] == 'WESTERDAM'
+
+
+def test_ambiguous_name_matches_by_name():
+    registry = BoatNames.registry()
+    assert registry[registry['name'] == 'AARON S MCCALL']['mmsi'].nunique() == 2 # two passenger vessels of that name
+    assert BoatNames.resolve('AARON S MCCALL') == (None, None, None)
+    merged = BoatsData.merge_ais_claa_data(visits(('AARON S MCCALL', '2023-06-01 16:00', '2023-06-01 20:00')),
+                                           calls(('AARON S MCCALL', '2023-06-01', '2023-06-01 09:00:00', '2023-06-01 11:00:00')))
+    assert len(merged) == 1
+
+
+def test_unresolved_names_do_not_match_each_other():
+    merged = BoatsData.merge_ais_claa_data(visits(('WESTERDAM', '2023-06-01 16:00', '2023-06-01 20:00')),
+                                           calls(('OOSTERDAM', '2023-06-01', '2023-06-01 09:00:00', '2023-06-01 11:00:00')))
+    assert merged.empty
+
+
+def test_observed_name_matches_by_mmsi():
+    pings = pd.DataFrame({'name': ['WESTERDAM'], 'mmsi': [244140580], 'imo': [9226891]})
+    merged = BoatsData.merge_ais_claa_data(visits(('WESTERDAM', '2023-06-01 16:00', '2023-06-01 20:00')),
+                                           calls(('WESTERDAM', '2023-06-01', '2023-06-01 09:00:00', '2023-06-01 11:00:00')), pings = pings)
+    assert len(merged) == 1
+    assert BoatNames.vesselKeys(['WESTERDAM'], BoatNames.observe(pings)).iloc[0] == 'mmsi:244140580'
+
+
+def test_unknown_times_span_the_call_day():
+    schedule = calls(('WESTERDAM', '2023-06-01', 'unknown', 'unknown'), ('WESTERDAM', '2023-06-03', 'unknown', 'unknown'))
+    merged = BoatsData.merge_ais_claa_data(visits(('WESTERDAM', '2023-06-01 16:00', '2023-06-01 20:00'),
+                                                  ('WESTERDAM', '2023-06-02 16:00', '2023-06-02 20:00')), schedule)
+    assert len(merged) == 1 # the call of the visit's day, not the one two days later
+    assert merged['ts_in_claa'].iloc[0] == 'unknown'
+
+
+def test_index_cache_is_bounded():
+    frames = [calls(('WESTERDAM', '2023-06-01', '2023-06-01 09:00:00', '2023-06-01 11:00:00')) for _ in range(BoatsData.CLAA_INDEX_CACHE_SIZE + 3)]
+    indexes = [BoatsData.claaIndex(frame) for frame in frames]
+    assert len(BoatsData._claaIndexes) == BoatsData.CLAA_INDEX_CACHE_SIZE
+    assert BoatsData.claaIndex(frames[-1]) is indexes[-1] # the most recent frame is served from the cache
+    assert BoatsData.claaIndex(frames[0]) is not indexes[0] # the oldest was evicted and is rebuilt
@@ -0,0 +1,80 @@
+# GridIndex lookups give the same answer as testing every point against the layer with shapely
+import geopandas as gpd
+import numpy as np
+import pytest
+import shapely
+
+from GridIndex import GridIndex
+from ReferenceLayers import ReferenceLayers
+
+
+@pytest.fixture(autouse = True)
+def caches(tmp_path, monkeypatch):
+    monkeypatch.setattr(GridIndex, 'CACHE_FOLDER', str(tmp_path / 'grids'))
+    monkeypatch.setattr(ReferenceLayers, 'CACHE_FOLDER', str(tmp_path / 'layers'))
+    GridIndex.clear()
+    ReferenceLayers.clear()
+    yield
+    GridIndex.clear()
+    ReferenceLayers.clear()
+
+
+def probes(grid, count = 20000, seed = 0):
+    """random points around the layer, its vertices, points on cell edges and on the grid's max edges"""
+    geometry = grid.geometry
+    minx, miny, maxx, maxy = geometry.bounds
+    rng = np.random.default_rng(seed)
+    margin = (maxx - minx) * 0.1
+    x = [rng.uniform(minx - margin, maxx + margin, count)]
+    y = [rng.uniform(miny - margin, maxy + margin, count)]
+    vertices = shapely.get_coordinates(geometry)
+    x.append(vertices[:, 0])
+    y.append(vertices[:, 1])
+    ny, nx = grid.cells.shape
+    cols, rows = rng.integers(0, nx + 1, count // 4), rng.integers(0, ny + 1, count // 4)
+    x.append(grid.origin[0] + cols * grid.resolution) # cell corners
+    y.append(grid.origin[1] + rows * grid.resolution)
+    edge = np.linspace(miny, maxy, 500)
+    x += [np.full(500, maxx), np.linspace(minx, maxx, 500)]
+    y += [edge, np.full(500, maxy)]
+    return np.concatenate(x), np.concatenate(y)
+
+
+@pytest.mark.parametrize('name, epsg', [('port_glba', 4326), ('glba_geofence', 4326), ('dock_buffers', 3338)])
+def test_mask_matches_shapely(name, epsg):
+    grid = GridIndex.get(name, epsg)
+    x, y = probes(grid)
+    np.testing.assert_array_equal(grid.mask(x, y, 'intersects'), shapely.intersects_xy(grid.geometry, x, y))
+    np.testing.assert_array_equal(grid.mask(x, y, 'within'), shapely.contains_xy(grid.geometry, x, y))
+
+
+@pytest.fixture
+def gridAligned(tmp_path, monkeypatch):
+    """registers layers whose edges and vertices fall on grid lines: the extent is a whole number of cells"""
+    def register(name, geometry):
+        path = str(tmp_path / f'{name}.shp')
+        gpd.GeoDataFrame(geometry = [geometry], crs = 'EPSG:4326').to_file(path)
+        monkeypatch.setitem(ReferenceLayers.LAYERS, name, (path, 4326))
+        return name
+    return register
+
+
+@pytest.mark.parametrize('resolution', [0.1, 0.05, 0.25])
+def test_mask_matches_shapely_on_grid_lines(gridAligned, resolution):
+    square = gridAligned('square', shapely.box(-136.3, 58.1, -135.3, 59.1))
+    notch = gridAligned('notch', shapely.Polygon([(-136.3, 58.1), (-135.3, 58.1), (-135.3, 58.6), (-135.8, 58.6), (-135.8, 59.1), (-136.3, 59.1)]))
+    for name in [square, notch]:
+        grid = GridIndex.get(name, 4326, resolution)
+        steps = np.arange(-2, round(1 / resolution) + 3)
+        x, y = np.meshgrid(-136.3 + steps * resolution, 58.1 + steps * resolution) # every grid corner, max edges included
+        x, y = x.ravel(), y.ravel()
+        np.testing.assert_array_equal(grid.mask(x, y, 'intersects'), shapely.intersects_xy(grid.geometry, x, y), err_msg = name)
+        np.testing.assert_array_equal(grid.mask(x, y, 'within'), shapely.contains_xy(grid.geometry, x, y), err_msg = name)
+
+
+def test_cached_grid_matches_built_one():
+    built = GridIndex.get('port_glba', 4326)
+    GridIndex.clear()
+    cached = GridIndex.get('port_glba', 4326) # read back from CACHE_FOLDER
+    np.testing.assert_array_equal(cached.cells, built.cells)
+    assert cached.origin == built.origin and cached.resolution == built.resolution
@@ -0,0 +1,46 @@
+# Loading a subset of the AIS columns (App columns): ingestion must not need the columns it was told to skip
+import os
+
+import pandas as pd
+
+from app import App
+from BoatNames import BoatNames
+from BoatsData import BoatsData
+
+HEADER = 'bs_ts,mmsi,callsign,imo,name,nav_status,lat,lon,cog,sog,destination,eta,shiptype,draught,length,width'
+COLUMNS = ['bs_ts', 'name', 'lat', 'lon', 'sog', 'nav_status']
+
+
+def writeDay(folder, day = '2023-06-01', pings = 30):
+    """one day of pings of a vessel leaving Juneau, in the layout of the daily AIS csv files"""
+    rows = [HEADER]
+    for i in range(pings):
+        rows.append(f'{day} 00:{i:02d}:07,310327000,ZCBU5,9104005,GRAND PRINCESS,Under way using engine,'
+                    f'{58.2917 - i * 0.002:.6f},{-134.3960 - i * 0.004:.6f},220.0,{8 + i % 3}.0,CA YVR,,Passenger ship,8.5,290,36')
+    with open(os.path.join(folder, f'{day}.csv'), 'w') as f:
+        f.write('\n'.join(rows) + '\n')
+
+
+def test_load_without_mmsi(tmp_path):
+    writeDay(tmp_path)
+
+    app = App(str(tmp_path), columns = COLUMNS)
+
+    pings = app.boatsData.flatten(geometry = False)
+    assert len(pings) == 30
+    assert 'mmsi' not in pings.columns
+    assert not os.path.exists(BoatNames.CACHE_FOLDER) # loading data leaves the alias index alone
+    assert BoatNames.observe(pings).empty
+
+
+def test_merge_without_mmsi():
+    visits = pd.DataFrame({'date': [['2023-06-01']], 'boatName': ['GRAND PRINCESS'], 'portAfter': ['Skagway'], 'portBefore': ['Sitka'],
+                           'ts_in': [pd.Timestamp('2023-06-01 16:00', tz = 'UTC')], 'ts_out': [pd.Timestamp('2023-06-01 20:00', tz = 'UTC')]})
+    claa = pd.DataFrame({'date': ['2023-06-01'], 'year': [2023], 'boatName': ['GRAND PRINCESS'], 'portName': ['Glacier Bay'], 'nextPort': ['Skagway'],
+                         'ts_in': ['2023-06-01 09:00:00'], 'ts_out': ['2023-06-01 11:00:00']})
+
+    pings = pd.DataFrame({'name': ['GRAND PRINCESS'], 'bs_ts': [pd.Timestamp('2023-06-01 16:00', tz = 'UTC')]}) # loaded without mmsi
+    merged = BoatsData.merge_ais_claa_data(visits, claa, pings = pings)
+
+    assert len(merged) == 1 # the name still resolves through the vessel codes
+    assert merged['boatName'].iloc[0] == 'GRAND PRINCESS'
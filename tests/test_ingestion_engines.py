@@ -0,0 +1,39 @@
+# The ingestion engines (App engine and workers) build the same cruises as the grouped single process path
+import pandas as pd
+
+from app import App
+from aisfixtures import fleet, writeDays
+
+
+def cruises(app):
+    """cruise id -> (cruise days, cruise data in time order) of every vessel"""
+    return {cruise_id: (cruise.days, cruise.data.reset_index(drop = True))
+            for boat_data in app.boatsData.boatsDataDictionary.values() for cruise_id, cruise in boat_data.cruisesDataDictionary.items()}
+
+
+def assertSameCruises(app, reference):
+    found, expected = cruises(app), cruises(reference)
+    assert list(found) == list(expected)
+    for cruise_id in expected:
+        assert found[cruise_id][0] == expected[cruise_id][0], cruise_id
+        pd.testing.assert_frame_equal(found[cruise_id][1], expected[cruise_id][1], obj = cruise_id)
+    assert len(app.boatsData.nanData) == len(reference.boatsData.nanData)
+
+
+def test_fleet_cruises(tmp_path):
+    writeDays(tmp_path, fleet(), shuffle = True)
+    app = App(str(tmp_path))
+    assert sorted(cruises(app)) == ['AMSTERDAM_01', 'GRAND PRINCESS_01', 'WESTERDAM_01', 'WESTERDAM_02'] # breaks fall between files only
+    assert len(app.boatsData.nanData) == 4
+
+
+def test_vectorized_matches_grouped(tmp_path):
+    writeDays(tmp_path, fleet(), shuffle = True)
+    assertSameCruises(App(str(tmp_path), engine = 'vectorized'), App(str(tmp_path), engine = 'grouped'))
+
+
+def test_workers_match_single_process(tmp_path):
+    writeDays(tmp_path, fleet(), shuffle = True)
+    reference = App(str(tmp_path))
+    assertSameCruises(App(str(tmp_path), workers = 2), reference)
+    assertSameCruises(App(str(tmp_path), workers = 2, engine = 'vectorized'), reference)
@@ -0,0 +1,50 @@
+# IntervalJoin finds exactly the pairs a brute force overlap test finds
+import numpy as np
+import pandas as pd
+import pytest
+
+from IntervalJoin import IntervalJoin
+
+
+def intervals(rng, count, keys, missing = 0.05):
+    """random [start, end] intervals over two weeks, of random keys, some with a missing end or start"""
+    starts = pd.Timestamp('2023-06-01') + pd.to_timedelta(rng.integers(0, 14 * 24 * 60, count), unit = 'min')
+    ends = starts + pd.to_timedelta(rng.integers(0, 24 * 60, count), unit = 'min')
+    frame = pd.DataFrame({'key': rng.choice(keys, count), 'start': starts, 'end': ends, 'row': np.arange(count)})
+    frame.loc[rng.random(count) < missing, 'end'] = pd.NaT
+    frame.loc[rng.random(count) < missing, 'start'] = pd.NaT
+    return frame
+
+
+def bruteForce(left, right, tolerance):
+    """(left row, right row) of every pair of the same key whose intervals overlap, right widened by tolerance"""
+    pairs = left.merge(right, on = 'key', suffixes = ('_l', '_r')).dropna(subset = ['start_l', 'end_l', 'start_r', 'end_r'])
+    overlapping = (pairs['start_r'] - tolerance <= pairs['end_l']) & (pairs['end_r'] + tolerance >= pairs['start_l'])
+    return set(zip(pairs['row_l'][overlapping], pairs['row_r'][overlapping]))
+
+
+@pytest.mark.parametrize('seed, tolerance', [(0, pd.Timedelta(0)), (1, pd.Timedelta(hours = 1)), (2, pd.Timedelta(days = 2))])
+def test_join_matches_brute_force(seed, tolerance):
+    rng = np.random.default_rng(seed)
+    keys = ['mmsi:1', 'mmsi:2', 'name:A', 'name:B', 'name:C']
+    right = intervals(rng, 600, keys[:4])
+    left = intervals(rng, 400, keys)
+    joined = IntervalJoin(right, 'key', 'start', 'end', tolerance).join(left, 'start', 'end', suffixes = ('_l', '_r'))
+
+    found = list(zip(joined['row_l'], joined['row_r']))
+    assert len(found) == len(set(found)) # no pair twice
+    assert set(found) == bruteForce(left, right, tolerance)
+    order = pd.DataFrame({'left': joined['row_l'], 'start': joined['start_r'], 'right': joined['row_r']})
+    assert order.equals(order.sort_values(['left', 'start', 'right']).reset_index(drop = True)) # left's row order, then start
+
+
+def test_pairs_of_nested_intervals():
+    """a long interval ending last keeps the earlier short ones reachable through the running max of ends"""
+    right = pd.DataFrame({'key': 'k', 'start': pd.to_datetime(['2023-06-01 00:00', '2023-06-01 01:00', '2023-06-01 02:00', '2023-06-03 00:00']),
+                          'end': pd.to_datetime(['2023-06-02 23:00', '2023-06-01 01:30', '2023-06-01 02:30', '2023-06-03 01:00'])})
+    index = IntervalJoin(right, 'key', 'start', 'end')
+    starts = IntervalJoin.nanoseconds(pd.Series(pd.to_datetime(['2023-06-01 03:00', '2023-06-01 01:15'])))
+    ends = IntervalJoin.nanoseconds(pd.Series(pd.to_datetime(['2023-06-01 04:00', '2023-06-01 02:10'])))
+    queries, positions = index.pairs('k', starts, ends)
+    assert list(zip(queries, positions)) == [(0, 0), (1, 0), (1, 1), (1, 2)]
+    assert index.pairs('missing', starts, ends)[0].size == 0
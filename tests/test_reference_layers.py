@@ -0,0 +1,32 @@
+# ReferenceLayers cache keys: a layer is read again when any part of its shapefile changes
+import os
+import shutil
+
+import pytest
+
+from ReferenceLayers import ReferenceLayers
+
+
+@pytest.fixture
+def layer(tmp_path, monkeypatch):
+    """port_glba copied to tmp_path and registered as 'copy', with its caches in tmp_path"""
+    for part in os.listdir('./data/shapes'):
+        if part.startswith('port_GLBA.'):
+            shutil.copy(os.path.join('./data/shapes', part), tmp_path)
+    monkeypatch.setitem(ReferenceLayers.LAYERS, 'copy', (str(tmp_path / 'port_GLBA.shp'), 4326))
+    monkeypatch.setattr(ReferenceLayers, 'CACHE_FOLDER', str(tmp_path / 'cache'))
+    yield tmp_path
+    ReferenceLayers.clear()
+
+
+def test_sidecar_change_invalidates_signature(layer):
+    before = ReferenceLayers.signature('copy')
+    with open(layer / 'port_GLBA.prj', 'a') as f:
+        f.write(' ')
+    assert ReferenceLayers.signature('copy') != before
+
+
+def test_missing_layer_names_its_file(monkeypatch):
+    monkeypatch.setitem(ReferenceLayers.LAYERS, 'missing', ('./data/shapes/missing.shp', None))
+    with pytest.raises(FileNotFoundError, match = 'missing.shp'):
+        ReferenceLayers.get('missing')
@@ -0,0 +1,72 @@
+# Snapshot manifests and incremental loads (App snapshot): only new files are ingested, a changed file rebuilds
+import os
+
+import pandas as pd
+
+from app import App
+from Snapshot import Snapshot
+from aisfixtures import fleet, writeDays
+
+
+def days(pings, *names):
+    """the pings of the given UTC days"""
+    return [ping for ping in pings if ping['bs_ts'][:10] in names]
+
+
+def test_compare_finds_new_changed_and_removed(tmp_path):
+    folder = tmp_path / 'ais'
+    folder.mkdir()
+    paths = writeDays(folder, days(fleet(), '2023-06-01', '2023-06-02', '2023-06-03'))
+    snapshot = Snapshot(str(tmp_path / 'snapshot.pkl'))
+    for path in paths:
+        snapshot.record(str(folder), path, 1)
+
+    assert snapshot.compare(str(folder), paths) == ([], [])
+    os.utime(paths[0], ns = (1, 1)) # touched, same contents
+    assert snapshot.compare(str(folder), paths) == ([], [])
+
+    with open(paths[1], 'a') as f:
+        f.write('2023-06-02 23:59:00,310327000,,,GRAND PRINCESS,Under way using engine,58.0,-135.0,180.0,10.0,,,Passenger ship,,,\n')
+    new = writeDays(folder, days(fleet(), '2023-06-04'))
+    os.remove(paths[2])
+    assert snapshot.compare(str(folder), paths[:2] + new) == (new, [paths[1], os.path.join(str(folder), os.path.basename(paths[2]))])
+
+
+def cruises(app):
+    return {cruise_id: cruise.data.reset_index(drop = True)
+            for boat_data in app.boatsData.boatsDataDictionary.values() for cruise_id, cruise in boat_data.cruisesDataDictionary.items()}
+
+
+def test_incremental_load_matches_full_load(tmp_path):
+    folder = tmp_path / 'ais'
+    folder.mkdir()
+    pings = fleet()
+    snapshot_path = str(tmp_path / 'snapshot.pkl')
+    writeDays(folder, days(pings, '2023-06-01', '2023-06-02'))
+    App(str(folder), snapshot = snapshot_path)
+
+    writeDays(folder, days(pings, '2023-06-03', '2023-06-04'))
+    incremental = App(str(folder), snapshot = snapshot_path)
+    assert [os.path.basename(path) for path, _ in incremental.ingestedFiles] == ['2023-06-03.csv', '2023-06-04.csv'] # only the new files
+
+    full = cruises(App(str(folder)))
+    found = cruises(incremental)
+    assert list(found) == list(full)
+    for cruise_id in full:
+        pd.testing.assert_frame_equal(found[cruise_id], full[cruise_id], obj = cruise_id)
+    assert incremental.rowsParsedCount == len(pings)
+
+
+def test_changed_file_rebuilds(tmp_path):
+    folder = tmp_path / 'ais'
+    folder.mkdir()
+    pings = fleet()
+    snapshot_path = str(tmp_path / 'snapshot.pkl')
+    paths = writeDays(folder, days(pings, '2023-06-01', '2023-06-02'))
+    App(str(folder), snapshot = snapshot_path)
+
+    writeDays(folder, days(pings, '2023-06-01')[:-5]) # rows already in the snapshot disappear
+    rebuilt = App(str(folder), snapshot = snapshot_path)
+    assert [path for path, _ in rebuilt.ingestedFiles] == paths
+    assert rebuilt.rowsParsedCount == len(days(pings, '2023-06-01', '2023-06-02')) - 5
+    assert Snapshot(snapshot_path).load().compare(str(folder), paths) == ([], [])